@@ -0,0 +1,108 @@
+"""
+End-to-end load generator for /analyze, fully offline.
+
+Serves the fixture corpus from a local HTTP server, answers Gemini calls with
+the fake model, and drives the real FastAPI app in-process through its ASGI
+interface. Route handling, the pipeline, fetching over a socket, extraction
+(in the worker pool) and response serialization all run exactly as deployed.
+For each concurrency level, a closed loop of that many clients sends the
+requests, and the generator reports p50/p95/p99 latency, throughput, and how
+many page fetches and Gemini calls were actually made. `--unique` sends every
+request to a distinct URL, so concurrent identical requests cannot coalesce.
+
+Run from the backend/ directory:
+    python -m benchmarks.bench_load
+    python -m benchmarks.bench_load --concurrency 1,8,32 --requests 128 --llm-latency 0.2 --pages small,large
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+from .fixtures import CORPUS_SECTIONS, build_corpus
+from .offline import build_offline_pipeline
+from .site_server import serve_fixtures
+from main import app
+from src.api import routes
+from src.utils.metrics import STAGE_SECONDS
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', default='1,4,16,64',
+                        help='comma-separated numbers of concurrent clients (default: 1,4,16,64)')
+    parser.add_argument('--requests', type=int, default=64, help='requests sent at each concurrency level')
+    parser.add_argument('--pages', default='small,medium,large',
+                        help=f"comma-separated corpus pages to request in rotation ({', '.join(CORPUS_SECTIONS)})")
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='seconds per fake Gemini call')
+    parser.add_argument('--llm-jitter', type=float, default=0.2, help='latency variation, as a fraction of it')
+    parser.add_argument('--site-latency', type=float, default=0.0, help='seconds the fixture server waits per response')
+    parser.add_argument('--unique', action='store_true',
+                        help='make every URL distinct (a query parameter) instead of rotating through the pages')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='extraction worker processes (default: EXTRACTION_PROCESSES; 0 = thread)')
+    return parser.parse_args()
+
+async def _run_level(client: httpx.AsyncClient, urls, concurrency: int, total: int, unique: bool = False):
+    """Sends `total` requests from `concurrency` clients; returns (latencies, errors, wall seconds)."""
+    latencies, errors = [], 0
+    next_index = iter(range(total))
+
+    async def client_loop():
+        nonlocal errors
+        for index in next_index:
+            started = time.perf_counter()
+            url = urls[index % len(urls)]
+            if unique:
+                url += f"?request={index}-{concurrency}"
+            response = await client.post('/analyze', json={'url': url})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+def _percentiles(latencies):
+    if len(latencies) < 2:
+        return latencies * 3
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return cuts[49], cuts[94], cuts[98]
+
+async def _run(args, base_url: str, pages):
+    pipeline = build_offline_pipeline(base_url, args.llm_latency, args.llm_jitter, args.processes)
+    app.dependency_overrides[routes.get_analysis_pipeline] = lambda: pipeline
+    urls = [f"{base_url}/{name}.html" for name in pages]
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark', timeout=None) as client:
+            # One untimed pass so connection set-up and first-call costs stay out of the numbers
+            for url in urls:
+                response = await client.post('/analyze', json={'url': url})
+                response.raise_for_status()
+
+            print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>8} "
+                  f"{'fetches':>8} {'llm calls':>10}")
+            for concurrency in [int(c) for c in args.concurrency.split(',')]:
+                fetches, llm_calls = STAGE_SECONDS.count(stage='fetch'), STAGE_SECONDS.count(stage='llm')
+                latencies, errors, wall = await _run_level(client, urls, concurrency, args.requests, args.unique)
+                p50, p95, p99 = _percentiles(latencies)
+                print(f"{concurrency:8d} {len(latencies):9d} {errors:7d} {p50 * 1000:7.0f}ms {p95 * 1000:7.0f}ms "
+                      f"{p99 * 1000:7.0f}ms {len(latencies) / wall:8.1f} "
+                      f"{STAGE_SECONDS.count(stage='fetch') - fetches:8d} {STAGE_SECONDS.count(stage='llm') - llm_calls:10d}")
+    finally:
+        app.dependency_overrides.pop(routes.get_analysis_pipeline, None)
+        await pipeline.scraper.aclose()
+        if pipeline.extraction_pool is not None:
+            pipeline.extraction_pool.shutdown()
+
+def main():
+    args = _parse_args()
+    pages = build_corpus(args.pages.split(','))
+    print(f"Pages: {', '.join(f'{name} ({len(html) / 1024:.0f}KB)' for name, html in pages.items())}; "
+          f"fake LLM {args.llm_latency * 1000:.0f}ms +/-{args.llm_jitter:.0%}")
+    with serve_fixtures(pages, latency=args.site_latency) as base_url:
+        asyncio.run(_run(args, base_url, list(pages)))
+
+if __name__ == "__main__":
+    main()
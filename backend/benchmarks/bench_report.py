@@ -0,0 +1,45 @@
+"""
+Benchmark for PDF report generation (PDFReportService.generate_report).
+
+Builds reports from the fixture corpus and the canned analysis, for each
+sentiment (the chart differs per sentiment) and with short and long text
+sections, and reports the best-of time per report along with the PDF size.
+
+Run from the backend/ directory:
+    python -m benchmarks.bench_report
+"""
+import time
+from src.models.data_models import AIAnalysis, AnalysisReport, ProcessedContent
+from src.processors.content_extractor import extract_and_clean_content
+from src.services.report_service import PDFReportService
+from .fixtures import CANNED_ANALYSIS, build_corpus
+
+def make_report(sentiment: str, text_scale: int) -> AnalysisReport:
+    """A report for the medium fixture page, with its text sections repeated `text_scale` times."""
+    content = ProcessedContent.parse_obj(extract_and_clean_content(build_corpus(['medium'])['medium']))
+    analysis = dict(CANNED_ANALYSIS, sentiment_analysis=dict(CANNED_ANALYSIS['sentiment_analysis'], sentiment=sentiment))
+    analysis['summary'] = " ".join([analysis['summary']] * text_scale)
+    analysis['key_points'] = analysis['key_points'] * text_scale
+    analysis['competitive_positioning'] = " ".join([analysis['competitive_positioning']] * text_scale)
+    return AnalysisReport(url="https://example.com/benchmark", content_analysis=content, ai_summary=AIAnalysis.parse_obj(analysis))
+
+def _best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    service = PDFReportService()
+    print(f"{'sentiment':>10} {'text':>6} {'time':>10} {'pdf size':>10}")
+    for text_scale in (1, 20):
+        for sentiment in ('Positive', 'Neutral', 'Negative'):
+            report = make_report(sentiment, text_scale)
+            pdf_bytes = service.generate_report(report)  # first call also pays one-off import and font costs
+            seconds = _best_of(lambda: service.generate_report(report), repeat=10)
+            print(f"{sentiment:>10} {'x' + str(text_scale):>6} {seconds * 1000:8.1f}ms {len(pdf_bytes) / 1024:8.1f}KB")
+
+if __name__ == "__main__":
+    main()
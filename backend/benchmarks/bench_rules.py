@@ -0,0 +1,90 @@
+"""
+Benchmark for URL allow/deny rules (URLValidator.is_allowed).
+
+Generates a deny list of random domains plus a few path rules, then times
+building the DomainRuleSet and looking up URLs that hit a domain rule, hit
+a path rule or miss entirely. The previous approach, one regex per rule
+tried in turn, is timed on the same URLs for comparison; at large rule
+counts it is only run on a handful of URLs.
+
+Run from the backend/ directory:
+    python -m benchmarks.bench_rules
+    python -m benchmarks.bench_rules --rules 1000,10000,100000 --lookups 50000
+"""
+import argparse
+import random
+import re
+import time
+from src.utils.domain_rules import DomainRuleSet
+from .legacy import legacy_is_allowed
+
+_TLDS = ['com', 'net', 'org', 'io', 'co.uk', 'de', 'info']
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rules', default='100,10000,100000', help='comma-separated deny-list sizes (default: 100,10000,100000)')
+    parser.add_argument('--lookups', type=int, default=20000, help='URLs looked up per size with the rule set')
+    parser.add_argument('--legacy-budget', type=float, default=2.0,
+                        help='seconds to spend timing the per-regex baseline per size')
+    return parser.parse_args()
+
+def _random_domain(rng: random.Random) -> str:
+    label = "".join(rng.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(rng.randint(5, 14)))
+    return f"{label}.{rng.choice(_TLDS)}"
+
+def make_rules(count: int, seed: int = 7):
+    """`count` rules: random domains and, one in a thousand, a path rule. Returns (rules, domains)."""
+    rng = random.Random(seed)
+    domains = [_random_domain(rng) for _ in range(count)]
+    rules = [f"{domain}/(admin|private)(/|$)" if index % 1000 == 999 else domain
+             for index, domain in enumerate(domains)]
+    return rules, domains
+
+def make_urls(domains, count: int, seed: int = 11):
+    """URLs that hit a blocked domain (via a subdomain), sit under a path rule's domain, or miss."""
+    rng = random.Random(seed)
+    urls = []
+    for index in range(count):
+        kind = index % 3
+        if kind == 0:
+            urls.append(f"https://www.{rng.choice(domains)}/some/page")
+        elif kind == 1:
+            urls.append(f"https://{rng.choice(domains)}/admin/panel")
+        else:
+            urls.append(f"https://cdn.{_random_domain(rng)}/index.html")
+    return urls
+
+def _legacy_pattern(rule: str) -> re.Pattern:
+    # The old pattern style, e.g. ^https?://([a-zA-Z0-9-]+\.)*example\.com(/.*)?$
+    host, slash, path = rule.partition('/')
+    path_pattern = f"/{path}.*" if slash else "(/.*)?"
+    return re.compile(rf"^https?://([a-zA-Z0-9-]+\.)*{re.escape(host)}{path_pattern}$")
+
+def main():
+    args = _parse_args()
+    print(f"{'rules':>8} {'build':>9} {'lookup':>10} {'blocked':>8} {'per-regex lookup':>17}")
+    for count in [int(c) for c in args.rules.split(',')]:
+        rules, domains = make_rules(count)
+        urls = make_urls(domains, args.lookups)
+        parsed = [(url.split('/')[2], '/' + url.split('/', 3)[3]) for url in urls]
+
+        started = time.perf_counter()
+        rule_set = DomainRuleSet(rules)
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        blocked = sum(rule_set.match(host, path) is not None for host, path in parsed)
+        lookup = (time.perf_counter() - started) / len(parsed)
+
+        patterns = [_legacy_pattern(rule) for rule in rules]
+        legacy_runs, started = 0, time.perf_counter()
+        while time.perf_counter() - started < args.legacy_budget and legacy_runs < len(urls):
+            legacy_is_allowed(urls[legacy_runs], [], patterns)
+            legacy_runs += 1
+        legacy = (time.perf_counter() - started) / legacy_runs
+
+        print(f"{count:8d} {build * 1000:7.0f}ms {lookup * 1e6:8.2f}us {blocked / len(parsed):8.0%} "
+              f"{legacy * 1e6:13.0f}us ({legacy_runs} URLs)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark for the text normalization stage (_process_text_pipeline).
+
+Feeds block-structured text of growing size, with the stray control and
+zero-width characters real pages contain, to both the previous regex/lambda
+pipeline and the current block-wise one, and reports the speedup.
+
+Run from the backend/ directory:
+    python -m benchmarks.bench_text_pipeline
+"""
+import random
+import time
+from src.processors.content_extractor import BLOCK_SEPARATOR, _process_text_pipeline
+from .legacy import legacy_process_text_pipeline
+
+_WORDS = ("the quick analysis of web content shows strong growth in search quality and "
+          "customer value across every market segment we measured this year").split()
+_NOISE = ["\t", "\n", "  ", "​", "\xa0", "\xad", "\r\n"]
+
+def make_text(target_chars: int, seed: int = 0) -> str:
+    """Builds block-separated text, mixing paragraphs with short menu-like blocks."""
+    rng = random.Random(seed)
+    blocks, size = [], 0
+    while size < target_chars:
+        if rng.random() < 0.3:
+            block = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 3)))
+        else:
+            words = []
+            for _ in range(rng.randint(20, 80)):
+                words.append(rng.choice(_WORDS))
+                words.append(rng.choice(_NOISE) if rng.random() < 0.05 else " ")
+            block = "".join(words)
+        blocks.append(block)
+        size += len(block) + 3
+    return f" {BLOCK_SEPARATOR} ".join(blocks)
+
+def _best_of(fn, text: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    print(f"{'text size':>10} {'legacy':>12} {'current':>12} {'speedup':>8}")
+    for target in (10_000, 100_000, 1_000_000, 5_000_000):
+        text = make_text(target)
+        repeat = 5 if target < 1_000_000 else 3
+        legacy_seconds = _best_of(legacy_process_text_pipeline, text, repeat)
+        current_seconds = _best_of(_process_text_pipeline, text, repeat)
+        print(f"{len(text) / 1024:8.0f}KB {legacy_seconds * 1000:10.1f}ms {current_seconds * 1000:10.1f}ms "
+              f"{legacy_seconds / current_seconds:7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Deterministic HTML fixtures for the offline benchmarks.
+
+Every page is generated from a fixed seed, so the corpus is identical from run
+to run and no benchmark depends on what a live website serves that day.
+"""
+import random
+from collections import OrderedDict
+
+_WORDS = ("content analysis engine page article section market product customer growth "
+          "strategy platform search result quality performance design value team report").split()
+
+# Corpus name -> number of article sections. Each section is roughly 1.3 KB of HTML,
+# so the pages run from ~15 KB to ~4 MB, just under SCRAPER_MAX_CONTENT_BYTES.
+CORPUS_SECTIONS = OrderedDict([
+    ('small', 10),
+    ('medium', 100),
+    ('large', 1000),
+    ('xlarge', 3000),
+])
+
+# What the fake Gemini model answers: a schema-valid analysis, and short notes for section prompts
+CANNED_ANALYSIS = {
+    "summary": "A synthetic article about content analysis, search quality and customer growth.",
+    "key_points": [
+        "The page discusses content analysis across several sections.",
+        "Search quality and performance are recurring themes.",
+        "Customer value is tied to product strategy.",
+    ],
+    "sentiment_analysis": {"sentiment": "Positive", "tone": "Professional"},
+    "topic_identification": ["Content analysis", "Search quality", "Product strategy"],
+    "seo_analysis": {
+        "recommendations": ["Add a descriptive H1 for each section.", "Shorten the meta description."],
+        "target_keywords": ["content analysis", "search quality", "customer growth"],
+    },
+    "readability": {
+        "score_description": "Easily understandable by a general audience.",
+        "accessibility_notes": ["Add alt text to images."],
+    },
+    "competitive_positioning": "Positions the platform as a quality-focused analysis engine.",
+}
+CANNED_SECTION_NOTES = "Notes: this part covers content analysis, search quality and customer growth in a professional tone."
+
+def make_page(sections: int, seed: int = 0) -> str:
+    """Builds a realistic article page with navigation, headings, emphasis, scripts and JSON-LD."""
+    rng = random.Random(seed)
+
+    def sentence(n=14):
+        return " ".join(rng.choice(_WORDS) for _ in range(n)).capitalize() + "."
+
+    parts = [
+        "<!DOCTYPE html><html><head><title>Benchmark Page</title>",
+        '<meta name="description" content="A synthetic page for benchmarking.">',
+        '<meta name="keywords" content="Benchmark, Extraction, Speed">',
+        '<script type="application/ld+json">{"@type": "Article", "headline": "Benchmark"}</script>',
+        "<style>body { font-family: sans-serif; }</style></head><body>",
+        "<header><nav>" + "".join(f'<a href="/{w}">{w}</a>' for w in _WORDS) + "</nav></header>",
+        "<main><article><h1>Benchmark Article</h1>",
+    ]
+    for i in range(sections):
+        parts.append(f"<h{2 + i % 3}>Section {i} {rng.choice(_WORDS)}</h{2 + i % 3}>")
+        for _ in range(4):
+            parts.append(f"<p>{sentence()} <strong>{rng.choice(_WORDS)} {i}</strong> {sentence()} "
+                         f"<em>{rng.choice(_WORDS)}</em> &amp; {sentence(8)}</p>")
+        if i % 10 == 0:
+            parts.append(f"<aside>{sentence()}</aside><script>var s{i} = {i};</script>")
+    parts.append("</article></main><footer>Footer text &copy; 2024</footer></body></html>")
+    return "\n".join(parts)
+
+def build_corpus(names=None) -> "OrderedDict[str, str]":
+    """Returns {name: html} for the requested corpus entries (all of them by default)."""
+    names = names or list(CORPUS_SECTIONS)
+    return OrderedDict((name, make_page(CORPUS_SECTIONS[name], seed=index))
+                       for index, name in enumerate(names))
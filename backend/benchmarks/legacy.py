@@ -0,0 +1,80 @@
+"""
+Previous implementations of the extraction hot paths, kept only as baselines
+for the benchmarks in this package. Not used by the application.
+beautifulsoup4 is no longer an application dependency; only the extractor
+baseline needs it, so it is imported there.
+"""
+import json
+import re
+from langdetect import detect, LangDetectException
+
+def legacy_process_text_pipeline(raw_text: str) -> dict:
+    """The regex-and-lambda text pipeline that the block-wise normalizer replaced."""
+    text = re.sub(r'\s+', ' ', raw_text).strip()
+    text = "".join(filter(lambda char: char.isprintable(), text))
+    lines = (line.strip() for line in text.splitlines())
+    text = "\n".join(line for line in lines if len(line.split()) > 3)
+    detected_language = 'unknown'
+    try:
+        if text:
+            detected_language = detect(text[:500])
+    except LangDetectException:
+        pass
+    return {'cleaned_text': text, 'detected_language': detected_language}
+
+def legacy_extract_and_clean_content(html_content: str) -> dict:
+    """The multi-pass BeautifulSoup extractor that the single-pass engine replaced."""
+    from bs4 import BeautifulSoup  # pip install beautifulsoup4
+    soup = BeautifulSoup(html_content, 'html.parser')
+    document_outline = []
+    for i in range(1, 7):
+        for heading in soup.find_all(f'h{i}'):
+            if heading.get_text(strip=True):
+                document_outline.append({'level': i, 'text': heading.get_text(strip=True)})
+    key_phrases = set()
+    for tag in soup.find_all(['strong', 'b', 'em', 'i']):
+        key_phrases.add(tag.get_text(strip=True).lower())
+    keywords_tag = soup.find('meta', attrs={'name': 'keywords'})
+    if keywords_tag and keywords_tag.get('content'):
+        key_phrases.update(k.strip().lower() for k in keywords_tag.get('content').split(','))
+    content_type = 'Generic Page'
+    if soup.find('article'):
+        content_type = 'Article/Blog Post'
+    for script_tag in soup.find_all('script', type='application/ld+json'):
+        try:
+            if script_tag.string:
+                data = json.loads(script_tag.string)
+                if data.get('@type') in ['Product', 'Offer', 'ItemPage']:
+                    content_type = 'Product/E-commerce Page'
+                    break
+        except Exception:
+            continue
+
+    title = soup.title.string.strip() if soup.title else None
+    description_tag = soup.find('meta', attrs={'name': 'description'})
+    meta_description = description_tag.get('content', '').strip() if description_tag else None
+    main_content_area = soup.find('article') or soup.find('main') or soup.body
+    if main_content_area:
+        for element in main_content_area(['nav', 'header', 'footer', 'aside', 'script', 'style']):
+            element.decompose()
+    raw_text = main_content_area.get_text(separator=' ', strip=True) if main_content_area else ""
+    processed_text_data = legacy_process_text_pipeline(raw_text)
+
+    final_output = {
+        "title": title,
+        "meta_description": meta_description,
+        "main_content_text": processed_text_data['cleaned_text'],
+        "detected_language": processed_text_data['detected_language'],
+        'document_outline': document_outline,
+        'key_phrases': sorted(key_phrases),
+        'content_type': content_type,
+    }
+    return final_output
+
+def legacy_is_allowed(url: str, whitelist, blacklist) -> bool:
+    """URLValidator.is_allowed before the rule engine: every compiled pattern is tried in turn."""
+    if whitelist and not any(pattern.match(url) for pattern in whitelist):
+        return False
+    if blacklist and any(pattern.match(url) for pattern in blacklist):
+        return False
+    return True
@@ -0,0 +1,111 @@
+"""
+Offline stand-ins for the services that reach the outside world.
+
+FakeAnalysisService is a real AnalysisService (same semaphore, chunking,
+parsing and error handling) whose Gemini model is replaced by FakeGeminiModel,
+which answers after a configurable delay with a canned, schema-valid analysis.
+OfflineScraperService is a real WebScraperService that may only fetch from the
+local fixture server, without per-host throttling or the response store, so
+every request does the full fetch and extraction work.
+
+Run from the backend/ directory; importing this module needs no API key.
+"""
+import asyncio
+import json
+import os
+import random
+from typing import Optional
+from urllib.parse import urlparse
+
+# The analysis service refuses to import without a key; the fake model never uses it
+os.environ.setdefault("API_KEY", "offline-benchmark")
+# One timing log line per request would drown out the benchmark tables
+os.environ.setdefault("TIMING_LOG_ENABLED", "false")
+
+from src.config import settings
+from src.processors.extraction_pool import ExtractionPool
+from src.services.analysis_service import AnalysisService
+from src.services.pipeline_service import AnalysisPipeline
+from src.services.scraping_service import WebScraperService
+from src.utils.rate_limiter import HostScheduler
+from .fixtures import CANNED_ANALYSIS, CANNED_SECTION_NOTES
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class FakeGeminiModel:
+    """
+    Mimics the parts of genai.GenerativeModel the analysis service calls.
+    Each call sleeps for `latency` seconds, varied by up to +/- `jitter` (a
+    fraction of the latency), then returns the canned analysis, or short notes
+    for the per-section prompts of chunked mode. Streaming calls spread the same
+    delay over `stream_chunks` pieces.
+    """
+    def __init__(self, latency: float = 1.0, jitter: float = 0.0, stream_chunks: int = 8, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.stream_chunks = stream_chunks
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency * (1 + self.rng.uniform(-self.jitter, self.jitter)))
+
+    def _answer(self, prompt: str) -> str:
+        if "You are reading part" in prompt:
+            return CANNED_SECTION_NOTES
+        return json.dumps(CANNED_ANALYSIS)
+
+    async def _stream(self, text: str, delay: float):
+        size = max(1, -(-len(text) // self.stream_chunks))
+        for start in range(0, len(text), size):
+            await asyncio.sleep(delay / self.stream_chunks)
+            yield _FakeResponse(text[start:start + size])
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, request_options: Optional[dict] = None):
+        self.calls += 1
+        text, delay = self._answer(prompt), self._delay()
+        if stream:
+            return self._stream(text, delay)
+        await asyncio.sleep(delay)
+        return _FakeResponse(text)
+
+class FakeAnalysisService(AnalysisService):
+    """An AnalysisService backed by FakeGeminiModel, with the result cache off unless asked for."""
+    def __init__(self, latency: float = 1.0, jitter: float = 0.0, use_cache: bool = False):
+        super().__init__()
+        self.model = FakeGeminiModel(latency=latency, jitter=jitter)
+        if not use_cache:
+            self.cache = None
+
+class OfflineScraperService(WebScraperService):
+    """A WebScraperService that only fetches from the local fixture server, at full speed."""
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.allowed_netloc = urlparse(base_url).netloc
+        # The fixture server lives on loopback, which the SSRF check rightly rejects
+        self.validator.blocked_networks = []
+        # Politeness limits are meant for real origins; here they would only measure the limiter
+        self.host_scheduler = HostScheduler(rate=1e9, burst=1e9, concurrency=settings.SCRAPER_MAX_CONNECTIONS)
+        self.response_store = None
+
+    async def _validate_url(self, url: str) -> bool:
+        return urlparse(url).netloc == self.allowed_netloc
+
+def build_offline_pipeline(base_url: str, llm_latency: float = 1.0, llm_jitter: float = 0.0,
+                           processes: Optional[int] = None) -> AnalysisPipeline:
+    """
+    Wires the real AnalysisPipeline to the fixture server and the fake model.
+    `processes` defaults to EXTRACTION_PROCESSES; 0 extracts in a thread.
+    """
+    processes = settings.EXTRACTION_PROCESSES if processes is None else processes
+    extraction_pool = None
+    if processes > 0:
+        extraction_pool = ExtractionPool(processes)
+        extraction_pool.warm_up()
+    return AnalysisPipeline(
+        OfflineScraperService(base_url),
+        FakeAnalysisService(latency=llm_latency, jitter=llm_jitter),
+        extraction_pool,
+    )
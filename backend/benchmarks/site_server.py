@@ -0,0 +1,50 @@
+"""
+A local HTTP server that stands in for the target websites.
+
+Serves an in-memory {name: html} corpus at /<name>.html from a background
+thread, with an optional fixed delay before each response to mimic a remote
+origin. The scraper talks to it over a real socket, so connection pooling,
+streaming reads and header validation are all exercised.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like a real origin
+
+    def do_GET(self):
+        body = self.server.pages.get(self.path.lstrip('/').rsplit('.html', 1)[0])
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would drown out the benchmark output
+
+@contextmanager
+def serve_fixtures(pages: Dict[str, str], latency: float = 0.0) -> Iterator[str]:
+    """
+    Serves `pages` on an ephemeral port of 127.0.0.1 and yields the base URL.
+    `latency` is the delay, in seconds, before each response.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FixtureHandler)
+    server.daemon_threads = True
+    server.pages = {name: html.encode('utf-8') for name, html in pages.items()}
+    server.latency = latency
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
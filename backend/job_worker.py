@@ -0,0 +1,38 @@
+"""
+Runs analysis jobs from the job queue without serving the API, so workers can
+be scaled separately from API processes. Start any number of these next to
+the API (with JOB_WORKERS=0 there to keep analyses out of the API processes);
+they share jobs through JOB_QUEUE_PATH and reports through REPORT_STORE_PATH.
+
+Run from the backend/ directory:
+    JOB_WORKERS=8 python job_worker.py
+"""
+import asyncio
+import signal
+from src.api import routes
+from src.config import settings
+from src.processors.language_detector import load_language_profiles
+from src.services.job_queue import JobWorkers
+
+async def main():
+    load_language_profiles()
+    extraction_pool = routes.get_extraction_pool()
+    if extraction_pool is not None:
+        extraction_pool.warm_up()
+    workers = JobWorkers(routes.get_job_queue(), routes.get_analysis_pipeline(), routes.get_report_store(),
+                         max(settings.JOB_WORKERS, 1))
+    workers.start()
+    print(f"Running {workers.workers} job workers on {settings.JOB_QUEUE_PATH}")
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stopping.set)
+    await stopping.wait()
+
+    print("Stopping job workers; running jobs go back to the queue")
+    await workers.stop()
+    await routes.close_services()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,18 +1,48 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from src.api import routes
+from src.api.middleware import TimingMiddleware
+from src.processors.language_detector import load_language_profiles
+from src.utils.metrics import render_metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Creates the shared services (HTTP connection pool, caches, worker pools)
+    and loads language profiles before the first request arrives, then
+    releases them all on shutdown. The Gemini SDK and fpdf are not loaded
+    here: they are imported the first time an analysis or a PDF needs them.
+    """
+    load_language_profiles()
+    routes.create_services()
+    try:
+        yield
+    finally:
+        await routes.close_services()
 
 app = FastAPI(
     title="Web Content Analyzer API",
     description="An API to scrape and analyze web content.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Include the API router
 app.include_router(routes.router)
+app.add_middleware(TimingMiddleware)
 
 @app.get("/health")
 def health_check():
     """
     Simple health check endpoint.
     """
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus scrape endpoint: per-stage latency histograms, stage error
+    counters and request counters for this worker process.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -0,0 +1,62 @@
+import json
+import time
+from starlette.datastructures import MutableHeaders
+from ..config import settings
+from ..utils.metrics import REQUESTS, REQUEST_SECONDS, collect_spans, format_server_timing
+
+# Polled by monitoring every few seconds; logging each of those would drown out real traffic
+_UNLOGGED_PATHS = {'/metrics', '/health'}
+
+class TimingMiddleware:
+    """
+    Collects the stage spans of every request. Adds them to the response as a
+    Server-Timing header, records request counters and latency histograms,
+    and writes one structured (JSON) log line per request once its body has
+    been sent in full, so streamed responses are timed to the last byte.
+    Streamed responses can only report the stages that finished before
+    their headers went out.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        with collect_spans() as spans:
+            async def send_with_timing(message):
+                nonlocal status_code
+                if message['type'] == 'http.response.start':
+                    status_code = message['status']
+                    headers = MutableHeaders(scope=message)
+                    headers.append('Server-Timing', format_server_timing(spans, time.perf_counter() - started))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                self._finish(scope, status_code, spans, time.perf_counter() - started)
+
+    def _finish(self, scope, status_code: int, spans, seconds: float):
+        # The route template, not the raw path, keeps the label set bounded
+        route = getattr(scope.get('route'), 'path', 'unmatched')
+        REQUESTS.inc(method=scope['method'], route=route, status=status_code)
+        REQUEST_SECONDS.observe(seconds, method=scope['method'], route=route)
+        if not settings.TIMING_LOG_ENABLED or scope['path'] in _UNLOGGED_PATHS:
+            return
+
+        stages = {}
+        for stage, stage_seconds, _ in spans:
+            stages[stage] = round(stages.get(stage, 0.0) + stage_seconds * 1000, 2)
+        print(json.dumps({
+            'event': 'request_timing',
+            'method': scope['method'],
+            'route': route,
+            'status': status_code,
+            'duration_ms': round(seconds * 1000, 2),
+            'stages_ms': stages,
+            'errors': [f"{stage}:{error}" for stage, _, error in spans if error is not None],
+        }), flush=True)
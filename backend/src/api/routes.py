@@ -1,54 +1,304 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response, StreamingResponse
 from ..services.scraping_service import WebScraperService
 from ..services.analysis_service import AnalysisService
 from ..services.report_service import PDFReportService
-from ..models.data_models import URLAnalysisRequest, AnalysisReport, ProcessedContent
+from ..services.report_store import ReportStore
+from ..services.render_pool import PDFRenderPool
+from ..services.bulk_export_service import BulkExportService
+from ..services.pipeline_service import AnalysisPipeline, describe_pipeline_error
+from ..services.job_queue import JobQueue, JobWorkers
+from ..processors.extraction_pool import ExtractionPool
+from ..models.data_models import URLAnalysisRequest, BatchAnalysisRequest, AnalysisReport, BulkExportRequest, JobRequest, JobStatus
+from ..config import settings
+from ..utils.metrics import span
+from functools import lru_cache
+import asyncio
 import io
+import json
 
 router = APIRouter()
 
+# How often a long-running request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 1.0
+
+@lru_cache()
 def get_scraper_service():
+    # Shared per worker so every request draws from the same connection pool
     return WebScraperService()
 
+@lru_cache()
 def get_analysis_service():
     return AnalysisService()
 
+@lru_cache()
+def get_extraction_pool():
+    # None when EXTRACTION_PROCESSES is 0: extraction then runs in a thread
+    return ExtractionPool(settings.EXTRACTION_PROCESSES) if settings.EXTRACTION_PROCESSES > 0 else None
+
+@lru_cache()
+def get_report_store():
+    return ReportStore()
+
+@lru_cache()
+def get_render_pool():
+    # None when PDF_RENDER_PROCESSES is 0: bulk exports then render in threads
+    return PDFRenderPool(settings.PDF_RENDER_PROCESSES) if settings.PDF_RENDER_PROCESSES > 0 else None
+
+@lru_cache()
+def get_analysis_pipeline():
+    return AnalysisPipeline(get_scraper_service(), get_analysis_service(), get_extraction_pool())
+
+@lru_cache()
+def get_job_queue():
+    return JobQueue(settings.JOB_QUEUE_PATH, settings.JOB_LEASE_SECONDS)
+
+@lru_cache()
+def get_job_workers():
+    # None when JOB_WORKERS is 0: jobs are then run by separate job_worker.py processes
+    if settings.JOB_WORKERS <= 0:
+        return None
+    return JobWorkers(get_job_queue(), get_analysis_pipeline(), get_report_store(), settings.JOB_WORKERS)
+
+def create_services():
+    """
+    Builds the shared services of this worker up front (called from the app's
+    lifespan), so the first request does not pay for them.
+    """
+    get_analysis_pipeline()
+    get_report_store()
+    get_render_pool()
+    extraction_pool = get_extraction_pool()
+    if extraction_pool is not None:
+        extraction_pool.warm_up()
+    job_workers = get_job_workers()
+    if job_workers is not None:
+        job_workers.start()
+
+async def close_services():
+    """
+    Releases everything the getters above created: pooled connections, worker
+    processes and SQLite handles. The getters start from scratch afterwards.
+    """
+    # Stopped first: the jobs they were running go back to the queue
+    if get_job_workers.cache_info().currsize and get_job_workers() is not None:
+        await get_job_workers().stop()
+    if get_job_queue.cache_info().currsize:
+        get_job_queue().close()
+    if get_scraper_service.cache_info().currsize:
+        await get_scraper_service().aclose()
+    if get_analysis_service.cache_info().currsize:
+        get_analysis_service().close()
+    if get_report_store.cache_info().currsize:
+        get_report_store().close()
+    for getter in (get_extraction_pool, get_render_pool):
+        if getter.cache_info().currsize and getter() is not None:
+            getter().shutdown()
+    for getter in (get_scraper_service, get_analysis_service, get_extraction_pool, get_report_store,
+                   get_render_pool, get_analysis_pipeline, get_job_queue, get_job_workers):
+        getter.cache_clear()
+
+def _format_sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+async def _cancel_on_disconnect(http_request: Request, coro):
+    """
+    Awaits `coro`, cancelling it if the client disconnects first so an abandoned
+    request stops fetching and releases its Gemini slot.
+    """
+    task = asyncio.create_task(coro)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await http_request.is_disconnected():
+            task.cancel()
+            raise HTTPException(status_code=499, detail="Client closed the request.")
+
 @router.post("/analyze", response_model=AnalysisReport)
 async def analyze_url(
     request: URLAnalysisRequest,
-    scraper: WebScraperService = Depends(get_scraper_service),
-    analyzer: AnalysisService = Depends(get_analysis_service)
+    http_request: Request,
+    pipeline: AnalysisPipeline = Depends(get_analysis_pipeline),
+    report_store: ReportStore = Depends(get_report_store)
 ):
+    """
+    Analyzes one URL and saves the report server-side; the returned report_id
+    is what clients use to download exports later.
+    """
     try:
-        # --- THE FIX IS HERE: add 'await' ---
-        processed_data = await scraper.scrape_url(str(request.url))
+        report = await _cancel_on_disconnect(http_request, pipeline.analyze(str(request.url)))
+        report.report_id = await report_store.save(report)
+        return report
 
-        # Assemble the ProcessedContent model from the scraped data
-        content_analysis = ProcessedContent.parse_obj(processed_data)
+    except HTTPException:
+        raise
+    except Exception as e:
+        status_code, detail = describe_pipeline_error(e)
+        raise HTTPException(status_code=status_code, detail=detail)
 
-        # Send the main text to the AI for summary and analysis
-        ai_summary = analyzer.analyze_content(content_analysis.main_content_text)
+@router.post("/analyze/stream")
+async def analyze_url_stream(
+    request: URLAnalysisRequest,
+    pipeline: AnalysisPipeline = Depends(get_analysis_pipeline),
+    report_store: ReportStore = Depends(get_report_store)
+):
+    """
+    Streaming variant of /analyze using Server-Sent Events. Emits 'fetched',
+    'extracted', 'llm_delta' and 'analysis' events as each stage completes,
+    then 'report' with the ID of the saved report, or a single 'error' event
+    with a status code and detail.
+    """
+    async def event_stream():
+        try:
+            content_analysis = None
+            async for event, payload in pipeline.analyze_stream(str(request.url)):
+                yield _format_sse(event, payload)
+                if event == 'extracted':
+                    content_analysis = payload
+                elif event == 'analysis':
+                    report = AnalysisReport(url=str(request.url), content_analysis=content_analysis, ai_summary=payload)
+                    yield _format_sse('report', {'report_id': await report_store.save(report)})
+        except Exception as e:
+            status_code, detail = describe_pipeline_error(e)
+            yield _format_sse('error', {'status_code': status_code, 'detail': detail})
 
-        # Assemble the final, comprehensive report
-        final_report = AnalysisReport(
-            url=request.url,
-            content_analysis=content_analysis,
-            ai_summary=ai_summary
-        )
-        return final_report
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-    except (ValueError, ConnectionError) as e:
-        raise HTTPException(status_code=400, detail=str(e))
+@router.post("/analyze/batch")
+async def analyze_batch(
+    request: BatchAnalysisRequest,
+    pipeline: AnalysisPipeline = Depends(get_analysis_pipeline),
+    report_store: ReportStore = Depends(get_report_store)
+):
+    """
+    Analyzes many URLs concurrently and streams one NDJSON line per URL as
+    soon as it finishes. Failed URLs are reported inline with their error.
+    """
+    if len(request.urls) > settings.BATCH_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {settings.BATCH_MAX_URLS} URLs.")
+
+    async def result_stream():
+        async for result in pipeline.analyze_batch(request.urls):
+            if result.report is not None:
+                result.report.report_id = await report_store.save(result.report)
+            yield result.json() + "\n"
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+def _job_status(job) -> JobStatus:
+    return JobStatus(
+        job_id=job.id, url=job.url, priority=job.priority, status=job.status, attempts=job.attempts,
+        created_at=job.created_at, updated_at=job.updated_at, report_id=job.report_id,
+        error=job.error, status_code=job.status_code,
+    )
+
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(request: JobRequest, job_queue: JobQueue = Depends(get_job_queue)):
+    """
+    Queues a URL for analysis and returns at once. Poll /jobs/{job_id} for
+    the outcome; the job survives restarts of the API and its workers.
+    """
+    job = await asyncio.to_thread(job_queue.enqueue, str(request.url), request.priority)
+    return _job_status(job)
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(
+    job_id: str,
+    job_queue: JobQueue = Depends(get_job_queue),
+    report_store: ReportStore = Depends(get_report_store)
+):
+    """
+    Returns a job's status, and its full report once it has succeeded.
+    """
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found. Finished jobs are deleted after a while.")
+    status = _job_status(job)
+    if job.status == 'succeeded':
+        status.report = await report_store.get(job.report_id)
+        if status.report is None:
+            status.error = "The report has expired; submit the URL again."
+    return status
+
+@router.get("/cache/stats")
+def cache_stats(analyzer: AnalysisService = Depends(get_analysis_service)):
+    """
+    Reports hit/miss counters for the AI analysis cache.
+    """
+    return analyzer.get_cache_stats()
+
+@router.get("/reports/{report_id}", response_model=AnalysisReport)
+async def get_stored_report(report_id: str, report_store: ReportStore = Depends(get_report_store)):
+    """
+    Returns a saved report, so clients can keep only a compact summary and
+    load the full report when it is needed.
+    """
+    report = await report_store.get(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found. It may have expired; run the analysis again.")
+    return report
+
+@router.get("/reports/{report_id}/pdf")
+async def export_stored_report_pdf(report_id: str, report_store: ReportStore = Depends(get_report_store)):
+    """
+    Downloads the PDF of a saved report. The PDF is rendered on the first
+    request only; later downloads are served from the report store.
+    """
+    try:
+        pdf_bytes = await report_store.get_pdf(report_id)
     except Exception as e:
-        # Catch other exceptions and provide a detailed error
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred in the analysis pipeline: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate PDF: {e}")
+    if pdf_bytes is None:
+        raise HTTPException(status_code=404, detail="Report not found. It may have expired; run the analysis again.")
+
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment;filename=analysis_report_{report_id}.pdf",
+            # A report never changes once saved
+            "Cache-Control": "private, max-age=86400",
+        }
+    )
+
+@router.post("/export/bulk")
+async def export_bulk(
+    request: BulkExportRequest,
+    report_store: ReportStore = Depends(get_report_store),
+    render_pool: PDFRenderPool = Depends(get_render_pool)
+):
+    """
+    Streams a ZIP archive with a PDF for each requested report (by ID or
+    inline) and a combined reports.csv. PDFs render in parallel across the
+    render pool and are sent as they finish.
+    """
+    total = len(request.report_ids) + len(request.reports)
+    if total == 0:
+        raise HTTPException(status_code=400, detail="Provide at least one report ID or report to export.")
+    if total > settings.BULK_EXPORT_MAX_REPORTS:
+        raise HTTPException(status_code=400, detail=f"A bulk export may contain at most {settings.BULK_EXPORT_MAX_REPORTS} reports.")
+
+    # Two reports per worker keep every process busy while finished PDFs are streamed out
+    window = 2 * (render_pool.max_workers if render_pool is not None else 2)
+    exporter = BulkExportService(report_store, render_pool, window=window)
+    return StreamingResponse(
+        exporter.stream_zip(request.report_ids, request.reports),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment;filename=analysis_reports.zip"}
+    )
 
 @router.post("/export/pdf")
 async def export_pdf(report: AnalysisReport):
     try:
         report_service = PDFReportService()
-        pdf_bytes = report_service.generate_report(report)
+        # Rendering (and the first fpdf import) is CPU-bound, so keep it off the event loop
+        with span('pdf_render'):
+            pdf_bytes = await asyncio.to_thread(report_service.generate_report, report)
         
         return StreamingResponse(
             io.BytesIO(pdf_bytes),
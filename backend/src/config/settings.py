@@ -4,4 +4,112 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
-GOOGLE_API_KEY = os.getenv("API_KEY")
\ No newline at end of file
+GOOGLE_API_KEY = os.getenv("API_KEY")
+
+# --- Scraper Settings ---
+# Per-request timeout (seconds) and connection pool limits for the async HTTP client.
+SCRAPER_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", "15"))
+SCRAPER_MAX_CONNECTIONS = int(os.getenv("SCRAPER_MAX_CONNECTIONS", "100"))
+SCRAPER_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("SCRAPER_MAX_KEEPALIVE_CONNECTIONS", "20"))
+SCRAPER_MAX_RETRIES = int(os.getenv("SCRAPER_MAX_RETRIES", "3"))
+# CA bundle used to verify scraped sites' certificates; empty means the certifi bundle.
+SCRAPER_CA_BUNDLE = os.getenv("SCRAPER_CA_BUNDLE", "")
+# Hard cap on downloaded body size, enforced while the body streams in.
+SCRAPER_MAX_CONTENT_BYTES = int(os.getenv("SCRAPER_MAX_CONTENT_BYTES", str(5 * 1024 * 1024)))
+
+# Per-host politeness: request rate (tokens/second), burst size and concurrent connections.
+SCRAPER_HOST_RATE = float(os.getenv("SCRAPER_HOST_RATE", "2"))
+SCRAPER_HOST_BURST = float(os.getenv("SCRAPER_HOST_BURST", "4"))
+SCRAPER_HOST_CONCURRENCY = int(os.getenv("SCRAPER_HOST_CONCURRENCY", "4"))
+# Retry backoff: exponential from BASE seconds, capped at MAX, with full jitter.
+SCRAPER_BACKOFF_BASE = float(os.getenv("SCRAPER_BACKOFF_BASE", "0.5"))
+SCRAPER_BACKOFF_MAX = float(os.getenv("SCRAPER_BACKOFF_MAX", "10"))
+# A Retry-After longer than this is treated as a failure instead of being waited out.
+SCRAPER_RETRY_AFTER_MAX = float(os.getenv("SCRAPER_RETRY_AFTER_MAX", "30"))
+
+# Per-worker DNS cache used by the SSRF check; connections go to the addresses it validated.
+# The system resolver does not expose record TTLs, so answers live for a fixed time.
+DNS_CACHE_TTL_SECONDS = float(os.getenv("DNS_CACHE_TTL_SECONDS", "60"))
+DNS_NEGATIVE_TTL_SECONDS = float(os.getenv("DNS_NEGATIVE_TTL_SECONDS", "5"))
+DNS_CACHE_MAX_ENTRIES = int(os.getenv("DNS_CACHE_MAX_ENTRIES", "4096"))
+DNS_TIMEOUT_SECONDS = float(os.getenv("DNS_TIMEOUT_SECONDS", "5"))
+
+# Optional allow/deny list files, one rule per line (see utils/domain_rules.py), added to the
+# built-in lists. A changed file is picked up within URL_RULES_RELOAD_SECONDS, without a restart.
+URL_WHITELIST_FILE = os.getenv("URL_WHITELIST_FILE", "")
+URL_BLACKLIST_FILE = os.getenv("URL_BLACKLIST_FILE", "")
+URL_RULES_RELOAD_SECONDS = float(os.getenv("URL_RULES_RELOAD_SECONDS", "5"))
+
+# Fetched pages are kept on disk so repeat scrapes can send conditional requests.
+RESPONSE_STORE_ENABLED = os.getenv("RESPONSE_STORE_ENABLED", "true").lower() == "true"
+RESPONSE_STORE_PATH = os.getenv("RESPONSE_STORE_PATH", "cache/response_store.sqlite3")
+RESPONSE_STORE_MAX_BYTES = int(os.getenv("RESPONSE_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# --- Analysis Pipeline Settings ---
+# Per-stage concurrency limits shared by /analyze and /analyze/batch on each worker.
+PIPELINE_FETCH_CONCURRENCY = int(os.getenv("PIPELINE_FETCH_CONCURRENCY", "32"))
+PIPELINE_EXTRACT_CONCURRENCY = int(os.getenv("PIPELINE_EXTRACT_CONCURRENCY", str(os.cpu_count() or 4)))
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "500"))
+
+# --- Gemini Settings ---
+# Maximum concurrent Gemini calls per worker, and the per-call timeout in seconds.
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "90"))
+# Long pages are split into chunks that are summarized in parallel and then combined,
+# instead of being cut off after the first prompt's worth of text. The token budget caps
+# how much of a page is read in total (roughly 4 characters per token).
+ANALYSIS_CHUNKED_MODE = os.getenv("ANALYSIS_CHUNKED_MODE", "true").lower() == "true"
+ANALYSIS_TOKEN_BUDGET = int(os.getenv("ANALYSIS_TOKEN_BUDGET", "40000"))
+
+# --- Analysis Cache Settings ---
+# Gemini results are cached by content hash in memory and in a SQLite file shared by all workers.
+ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH", "cache/analysis_cache.sqlite3")
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+ANALYSIS_CACHE_MEMORY_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MEMORY_ENTRIES", "256"))
+ANALYSIS_CACHE_DISK_ENTRIES = int(os.getenv("ANALYSIS_CACHE_DISK_ENTRIES", "10000"))
+
+# --- Content Extraction Settings ---
+# HTML parser backend: 'auto' (lxml when installed), 'lxml' or 'html.parser'.
+HTML_PARSER_BACKEND = os.getenv("HTML_PARSER_BACKEND", "auto")
+# Language detection: fixed seed for reproducible results, and how many results to memoize.
+LANGDETECT_SEED = int(os.getenv("LANGDETECT_SEED", "0"))
+LANGDETECT_MEMO_SIZE = int(os.getenv("LANGDETECT_MEMO_SIZE", "4096"))
+# Worker processes for HTML extraction; 0 runs extraction in a thread of the API process.
+EXTRACTION_PROCESSES = int(os.getenv("EXTRACTION_PROCESSES", str(os.cpu_count() or 1)))
+# Parse pages chunk by chunk while they download instead of after the transfer.
+# Only applies when EXTRACTION_PROCESSES is 0. The parsing then runs in worker threads of
+# the API process, next to the download, and never on the event loop.
+EXTRACTION_STREAM_PARSE = os.getenv("EXTRACTION_STREAM_PARSE", "true").lower() == "true"
+
+# --- Observability Settings ---
+# Print one JSON line per request with its per-stage timings (exposed on /metrics either way).
+TIMING_LOG_ENABLED = os.getenv("TIMING_LOG_ENABLED", "true").lower() == "true"
+
+# --- Report Store Settings ---
+# Finished reports are kept server-side so exports can be requested by report ID;
+# each PDF is rendered on its first download and cached next to its report.
+REPORT_STORE_PATH = os.getenv("REPORT_STORE_PATH", "cache/report_store.sqlite3")
+REPORT_STORE_TTL_SECONDS = int(os.getenv("REPORT_STORE_TTL_SECONDS", str(7 * 24 * 3600)))
+REPORT_STORE_MEMORY_ENTRIES = int(os.getenv("REPORT_STORE_MEMORY_ENTRIES", "256"))
+REPORT_STORE_DISK_ENTRIES = int(os.getenv("REPORT_STORE_DISK_ENTRIES", "10000"))
+
+# --- Bulk Export Settings ---
+# Worker processes that render PDFs for bulk exports; 0 renders them in threads of the API process.
+PDF_RENDER_PROCESSES = int(os.getenv("PDF_RENDER_PROCESSES", str(os.cpu_count() or 1)))
+BULK_EXPORT_MAX_REPORTS = int(os.getenv("BULK_EXPORT_MAX_REPORTS", "1000"))
+
+# --- Job Queue Settings ---
+# Persistent queue behind /jobs, shared by every process pointing at the same file.
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "cache/job_queue.sqlite3")
+# Concurrent jobs run by each API worker. Set to 0 to only accept jobs here and run them
+# in separate `python job_worker.py` processes instead.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Attempts per job; timeouts and unexpected errors are retried after BASE * 2^(attempt-1) seconds.
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "10"))
+# A running job whose worker stops renewing its lease for this long is picked up again.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+# Finished jobs are deleted after this long; their reports follow REPORT_STORE_TTL_SECONDS.
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
@@ -1,11 +1,16 @@
 from pydantic import BaseModel, HttpUrl, Field, validator
-from typing import Optional, List
+from typing import Literal, Optional, List
 
 # --- Input Validation Models (No Change) ---
 
 class URLAnalysisRequest(BaseModel):
     url: HttpUrl
 
+class BatchAnalysisRequest(BaseModel):
+    # Plain strings: each URL is validated on its own, so one bad entry is reported
+    # inline instead of rejecting the batch (the route caps the count at BATCH_MAX_URLS)
+    urls: List[str] = Field(..., min_items=1)
+
 # --- Intermediate & Final Content Models (UPDATED) ---
 
 class Heading(BaseModel):
@@ -59,4 +64,46 @@ class AnalysisReport(BaseModel):
     """
     url: HttpUrl
     content_analysis: ProcessedContent
-    ai_summary: AIAnalysis
\ No newline at end of file
+    ai_summary: AIAnalysis
+    # Set once the report is saved in the server-side report store; exports are requested by this ID
+    report_id: Optional[str] = None
+
+class BatchAnalysisResult(BaseModel):
+    """
+    A single NDJSON line streamed back from the batch endpoint. Exactly one of
+    `report` or `error` is set, so one failing URL never aborts the batch.
+    """
+    url: str
+    status_code: int
+    report: Optional[AnalysisReport] = None
+    error: Optional[str] = None
+
+class BulkExportRequest(BaseModel):
+    """
+    Reports to export as one ZIP archive: saved reports by ID, full reports
+    sent inline, or both. Archive entries are numbered in this order, IDs first.
+    """
+    report_ids: List[str] = []
+    reports: List[AnalysisReport] = []
+
+class JobRequest(BaseModel):
+    url: HttpUrl
+    # Higher-priority jobs are started first; jobs of equal priority in submission order
+    priority: Literal['high', 'normal', 'low'] = 'normal'
+
+class JobStatus(BaseModel):
+    """
+    The state of a background analysis job. `report` is filled in once the
+    job has succeeded; `error` and `status_code` describe the last failure.
+    """
+    job_id: str
+    url: str
+    priority: str
+    status: str = Field(..., description="queued, running, succeeded or failed")
+    attempts: int
+    created_at: float
+    updated_at: float
+    report_id: Optional[str] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    report: Optional[AnalysisReport] = None
@@ -1,99 +1,515 @@
+import codecs
 import json
 import re
-from bs4 import BeautifulSoup
-from langdetect import detect, LangDetectException
+from html.parser import HTMLParser
+from typing import Optional
+from ..config import settings
+from .language_detector import language_detector
+from ..utils.metrics import span
 
-def _analyze_document_structure(soup: BeautifulSoup) -> dict:
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # lxml is optional; the stdlib parser is always available
+    lxml_etree = None
+
+# Bump whenever a change to extraction, the text pipeline or language detection changes the
+# output, so extraction results stored with earlier versions are computed again
+EXTRACTION_VERSION = '1'
+
+# The HTML spec's encoding prescan only looks at the first 1024 bytes for a <meta> charset
+CHARSET_PRESCAN_BYTES = 1024
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+_HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+
+def _known_codec(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.decode('ascii') if isinstance(name, bytes) else name).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+def detect_charset(content_type: str, head: bytes) -> str:
+    """
+    Picks the document encoding from, in order of precedence, a byte order mark,
+    the Content-Type header, or a <meta> charset in the first bytes of the body.
+    Falls back to UTF-8.
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    header_match = _HEADER_CHARSET_RE.search(content_type or '')
+    charset = _known_codec(header_match.group(1)) if header_match else None
+    if not charset:
+        meta_match = _META_CHARSET_RE.search(head[:CHARSET_PRESCAN_BYTES])
+        charset = _known_codec(meta_match.group(1)) if meta_match else None
+    return charset or 'utf-8'
+
+class StreamingHTMLDecoder:
+    """
+    Decodes an HTML body chunk by chunk as it arrives from the network.
+    The first chunks are held back until enough bytes are available to sniff
+    the charset; after that each chunk is decoded immediately.
+    """
+    def __init__(self, content_type: str = ''):
+        self.content_type = content_type
+        self.charset = None
+        self._decoder = None
+        self._head = b''
+
+    def _start(self) -> str:
+        self.charset = detect_charset(self.content_type, self._head)
+        self._decoder = codecs.getincrementaldecoder(self.charset)(errors='replace')
+        head, self._head = self._head, b''
+        return self._decoder.decode(head)
+
+    def feed(self, chunk: bytes) -> str:
+        """Returns the text decoded so far from this chunk (possibly empty)."""
+        if self._decoder is not None:
+            return self._decoder.decode(chunk)
+        self._head += chunk
+        return self._start() if len(self._head) >= CHARSET_PRESCAN_BYTES else ''
+
+    def close(self) -> str:
+        """Flushes any buffered bytes at the end of the body."""
+        text = self._start() if self._decoder is None else ''
+        return text + self._decoder.decode(b'', final=True)
+
+# --- Single-Pass Extraction Engine ---
+
+# Elements that never have children, so no end tag is expected
+_VOID_TAGS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta',
+    'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex',
+    'nextid', 'spacer',
+})
+# Elements whose text is not page content (code, styles, inert templates, ruby annotations)
+_NON_TEXT_TAGS = frozenset({'script', 'style', 'template', 'rt', 'rp'})
+_HEADING_LEVELS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+_EMPHASIS_TAGS = frozenset({'strong', 'b', 'em', 'i'})
+_MAIN_CONTENT_TAGS = ('article', 'main', 'body')
+# Boilerplate regions left out of the main content text
+_BOILERPLATE_TAGS = frozenset({'nav', 'header', 'footer', 'aside'})
+# Elements that start a new block of text (paragraphs, list items, cells, line breaks, ...)
+_BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'body', 'br', 'dd', 'details', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'summary', 'table', 'td', 'th', 'tr', 'ul',
+})
+_PRODUCT_TYPES = ('Product', 'Offer', 'ItemPage')
+
+class _Capture:
+    """Collects the text strings found inside one element."""
+    __slots__ = ('kind', 'key', 'parts', 'skipping')
+
+    def __init__(self, kind: str, key=None):
+        self.kind = kind
+        self.key = key
+        self.parts = []
+        self.skipping = False
+
+class _SinglePassHandler:
     """
-    Analyzes the HTML soup to identify document structure, create an outline,
-    extract key phrases, and classify the content type.
+    Receives start-tag / end-tag / text events from a parser backend and builds
+    every extraction result (outline, key phrases, JSON-LD, metadata and main
+    content text) in the same walk over the document.
     """
-    # 1. Heading Hierarchy Detection & Document Outline Generation
-    document_outline = []
-    for i in range(1, 7):
-        for heading in soup.find_all(f'h{i}'):
-            if heading.get_text(strip=True):
-                document_outline.append({'level': i, 'text': heading.get_text(strip=True)})
-
-    # 2. Key Phrase Extraction (Heuristic Approach)
-    key_phrases = set()
-    # Extract text from emphasized tags (bold, italic)
-    for tag in soup.find_all(['strong', 'b', 'em', 'i']):
-        key_phrases.add(tag.get_text(strip=True).lower())
-    # Extract from meta keywords
-    keywords_tag = soup.find('meta', attrs={'name': 'keywords'})
-    if keywords_tag and keywords_tag.get('content'):
-        keywords = [k.strip().lower() for k in keywords_tag.get('content').split(',')]
-        key_phrases.update(keywords)
-    
-    # 3. Content Type Classification (Heuristic)
-    content_type = 'Generic Page'
-    if soup.find('article'):
-        content_type = 'Article/Blog Post'
-    # Check for e-commerce patterns in structured data
-    for script_tag in soup.find_all('script', type='application/ld+json'):
-        try:
-            if script_tag.string:
-                data = json.loads(script_tag.string)
-                if data.get('@type') in ['Product', 'Offer', 'ItemPage']:
+    def __init__(self):
+        # Each stack entry is [tag, captures opened by it, captures it paused]
+        self._stack = []
+        self._open_counts = {}
+        self._pending_text = []
+        self._non_text_depth = 0
+        self._captures = []
+        self._ld_json = None
+        self._heading_index = 0
+
+        self.title = None
+        self._title_seen = False
+        self.meta_description = None
+        self._description_seen = False
+        self.meta_keywords = None
+        self._keywords_seen = False
+        self.has_article = False
+        self.headings = []
+        self.key_phrases = set()
+        self.ld_json_blocks = []
+        self.main_content = {}
+
+    def _flush_text(self):
+        """Hands the text accumulated since the last tag to every open capture."""
+        if not self._pending_text:
+            return
+        text = "".join(self._pending_text)
+        self._pending_text = []
+        if self._ld_json is not None:
+            self._ld_json.append(text)
+        if self._non_text_depth:
+            return
+        text = text.strip()
+        if not text:
+            return
+        for capture in self._captures:
+            if not capture.skipping:
+                capture.parts.append(text)
+
+    def _break_block(self):
+        """Marks a block boundary in the main content text."""
+        for capture in self._captures:
+            if capture.kind == 'main' and not capture.skipping and capture.parts and capture.parts[-1] != BLOCK_SEPARATOR:
+                capture.parts.append(BLOCK_SEPARATOR)
+
+    def _mark_heading(self):
+        """Flags the block that starts here as a heading, so the text pipeline keeps it however short."""
+        for capture in self._captures:
+            if capture.kind == 'main' and not capture.skipping:
+                capture.parts.append(HEADING_MARKER)
+
+    def _open_capture(self, entry: list, kind: str, key=None):
+        capture = _Capture(kind, key)
+        self._captures.append(capture)
+        entry[1].append(capture)
+
+    def start(self, tag: str, attrs: dict):
+        self._flush_text()
+
+        if tag == 'meta':
+            name = attrs.get('name')
+            if name == 'description' and not self._description_seen:
+                self._description_seen = True
+                self.meta_description = (attrs.get('content') or '').strip()
+            elif name == 'keywords' and not self._keywords_seen:
+                self._keywords_seen = True
+                self.meta_keywords = attrs.get('content')
+        if tag in _BLOCK_TAGS:
+            self._break_block()
+        if tag in _HEADING_LEVELS:
+            self._mark_heading()
+        if tag in _VOID_TAGS:
+            return
+
+        entry = [tag, [], []]
+        if tag in _HEADING_LEVELS:
+            self._heading_index += 1
+            self._open_capture(entry, 'heading', (_HEADING_LEVELS[tag], self._heading_index))
+        elif tag in _EMPHASIS_TAGS:
+            self._open_capture(entry, 'emphasis')
+        elif tag == 'title' and not self._title_seen:
+            self._title_seen = True
+            self._open_capture(entry, 'title')
+        elif tag in _MAIN_CONTENT_TAGS and tag not in self.main_content:
+            self.main_content[tag] = None
+            self._open_capture(entry, 'main', tag)
+        if tag == 'article':
+            self.has_article = True
+        elif tag in _NON_TEXT_TAGS:
+            self._non_text_depth += 1
+            if tag == 'script' and attrs.get('type') == 'application/ld+json' and self._ld_json is None:
+                self._ld_json = []
+        elif tag in _BOILERPLATE_TAGS:
+            for capture in self._captures:
+                if capture.kind == 'main' and not capture.skipping:
+                    capture.skipping = True
+                    entry[2].append(capture)
+
+        self._stack.append(entry)
+        self._open_counts[tag] = self._open_counts.get(tag, 0) + 1
+
+    def end(self, tag: str):
+        # Stray end tags (no matching open element) are ignored
+        if not self._open_counts.get(tag):
+            return
+        self._flush_text()
+        while self._stack:
+            entry = self._stack.pop()
+            self._close_entry(entry)
+            if entry[0] == tag:
+                break
+
+    def _close_entry(self, entry: list):
+        name, opened, paused = entry
+        self._open_counts[name] -= 1
+        if name in _NON_TEXT_TAGS:
+            self._non_text_depth -= 1
+            if name == 'script' and self._ld_json is not None:
+                if self._ld_json:
+                    self.ld_json_blocks.append("".join(self._ld_json))
+                self._ld_json = None
+        for capture in paused:
+            capture.skipping = False
+        if name in _BLOCK_TAGS:
+            self._break_block()
+        for capture in opened:
+            self._captures.remove(capture)
+            self._finish_capture(capture)
+
+    def _finish_capture(self, capture: _Capture):
+        if capture.kind == 'heading':
+            text = "".join(capture.parts)
+            if text:
+                self.headings.append((capture.key, text))
+        elif capture.kind == 'emphasis':
+            self.key_phrases.add("".join(capture.parts).lower())
+        elif capture.kind == 'title':
+            self.title = "".join(capture.parts).strip() or None
+        elif capture.kind == 'main':
+            self.main_content[capture.key] = " ".join(capture.parts)
+
+    def data(self, text: str):
+        self._pending_text.append(text)
+
+    def close(self):
+        """Closes any elements still open at the end of the document."""
+        self._flush_text()
+        while self._stack:
+            self._close_entry(self._stack.pop())
+
+    def structure_analysis(self) -> dict:
+        """Assembles the outline, key phrases and content type from the collected events."""
+        # Outline is grouped by level (all h1s, then h2s, ...), in document order within a level
+        document_outline = [{'level': key[0], 'text': text} for key, text in sorted(self.headings, key=lambda h: h[0])]
+
+        key_phrases = set(self.key_phrases)
+        if self.meta_keywords:
+            key_phrases.update(k.strip().lower() for k in self.meta_keywords.split(','))
+
+        content_type = 'Article/Blog Post' if self.has_article else 'Generic Page'
+        # Check for e-commerce patterns in structured data
+        for block in self.ld_json_blocks:
+            try:
+                data = json.loads(block)
+                if data.get('@type') in _PRODUCT_TYPES:
                     content_type = 'Product/E-commerce Page'
                     break
-        except Exception:
-            continue
+            except Exception:
+                continue
+
+        return {
+            'document_outline': document_outline,
+            'key_phrases': sorted(key_phrases),
+            'content_type': content_type
+        }
 
-    return {
-        'document_outline': document_outline,
-        'key_phrases': sorted(list(key_phrases)),
-        'content_type': content_type
-    }
+    def main_content_text(self) -> str:
+        """Text of the first <article>, else the first <main>, else <body>."""
+        for tag in _MAIN_CONTENT_TAGS:
+            if tag in self.main_content:
+                return self.main_content[tag] or ""
+        return ""
+
+# --- Parser Backends ---
+# Every backend turns markup into start/end/data calls on a _SinglePassHandler
+# and supports incremental feed(), so parsing can run while the page downloads.
+
+class _StdlibParserBackend(HTMLParser):
+    """Pure-Python fallback built on html.parser."""
+    def __init__(self, handler: _SinglePassHandler):
+        super().__init__(convert_charrefs=True)
+        self.handler = handler
+
+    def handle_starttag(self, tag, attrs):
+        self.handler.start(tag, {name: value or '' for name, value in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self.handler.end(tag)
+
+    def handle_endtag(self, tag):
+        self.handler.end(tag)
+
+    def handle_data(self, data):
+        self.handler.data(data)
+
+    def close(self):
+        super().close()
+        self.handler.close()
+
+class _LxmlTarget:
+    """Adapts lxml's parser-target callbacks to the handler interface."""
+    def __init__(self, handler: _SinglePassHandler):
+        self.handler = handler
+
+    def start(self, tag, attrib):
+        self.handler.start(tag, dict(attrib))
+
+    def end(self, tag):
+        self.handler.end(tag)
+
+    def data(self, data):
+        self.handler.data(data)
+
+    def close(self):
+        self.handler.close()
+
+class _LxmlParserBackend:
+    """libxml2-based backend; several times faster than html.parser on large pages."""
+    def __init__(self, handler: _SinglePassHandler):
+        self.handler = handler
+        self._parser = lxml_etree.HTMLParser(target=_LxmlTarget(handler), no_network=True)
+        self._fed = False
+
+    def feed(self, text: str):
+        self._fed = True
+        self._parser.feed(text)
+
+    def close(self):
+        # libxml2 rejects a document with no input at all ("no element found");
+        # an empty body is simply a page without content, as with html.parser
+        if not self._fed:
+            self.handler.close()
+            return
+        self._parser.close()
+
+PARSER_BACKENDS = {'html.parser': _StdlibParserBackend}
+if lxml_etree is not None:
+    PARSER_BACKENDS['lxml'] = _LxmlParserBackend
+
+def extraction_fingerprint() -> str:
+    """Identifies the code and settings that extraction output depends on."""
+    return f"{EXTRACTION_VERSION}:{resolve_parser_backend()}"
+
+def resolve_parser_backend(name: Optional[str] = None) -> str:
+    """
+    Returns the backend to use for `name` (default: the HTML_PARSER_BACKEND setting).
+    'auto' picks the fastest installed backend; unavailable backends fall back to html.parser.
+    """
+    name = name or settings.HTML_PARSER_BACKEND
+    if name == 'auto':
+        return 'lxml' if 'lxml' in PARSER_BACKENDS else 'html.parser'
+    return name if name in PARSER_BACKENDS else 'html.parser'
+
+class HTMLContentExtractor:
+    """
+    Extracts metadata, structure and main content from HTML in a single pass.
+    Markup can be supplied all at once or in chunks via feed(); close()
+    finishes parsing and returns the same dictionary as extract_and_clean_content.
+    """
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = resolve_parser_backend(backend)
+        self._handler = _SinglePassHandler()
+        self._parser = PARSER_BACKENDS[self.backend](self._handler)
+
+    def feed(self, text: str):
+        if text:
+            with span('parse'):
+                self._parser.feed(text)
+
+    def close(self) -> dict:
+        with span('parse'):
+            self._parser.close()
+        handler = self._handler
+        processed_text_data = _process_text_pipeline(handler.main_content_text())
+
+        final_output = {
+            "title": handler.title,
+            "meta_description": handler.meta_description,
+            "main_content_text": processed_text_data['cleaned_text'],
+            "detected_language": processed_text_data['detected_language']
+        }
+        # Merge the structure analysis results into the final dictionary
+        final_output.update(handler.structure_analysis())
+        return final_output
+
+# --- Text Normalization ---
+
+# Inserted by the extractor between block-level elements. It counts as whitespace and is
+# not printable, so it never survives normalization; blocks are split on it first.
+BLOCK_SEPARATOR = '\u2029'
+# Put at the start of a heading's block, and removed by normalization like the separator.
+# Headings are kept whatever their length: they mark where the page's sections begin.
+HEADING_MARKER = '\u2028'
+# Blocks of fewer than this many words (menu items, buttons, captions) are dropped
+MIN_BLOCK_WORDS = 4
+# Very large blocks are normalized in slices of about this many characters
+_NORMALIZE_CHUNK_CHARS = 256 * 1024
+_WHITESPACE_RE = re.compile(r'\s')
+
+def _compile_char_class(code_points) -> re.Pattern:
+    """Compiles a sorted list of code points into a single character-class regex of ranges."""
+    ranges = []
+    for code_point in code_points:
+        if ranges and ranges[-1][1] == code_point - 1:
+            ranges[-1][1] = code_point
+        else:
+            ranges.append([code_point, code_point])
+    members = "".join(
+        re.escape(chr(low)) if low == high else f"{re.escape(chr(low))}-{re.escape(chr(high))}"
+        for low, high in ranges
+    )
+    return re.compile(f"[{members}]+")
+
+# Deletes the non-printable characters seen in practice (controls, zero-width and
+# bidi marks, soft hyphens, BOMs); anything rarer is caught by a per-character fallback.
+# A compiled character class beats str.translate here: it scans in C and only
+# allocates where something is actually removed.
+_NON_PRINTABLE_RE = _compile_char_class(
+    code_point for code_point in list(range(0x3000)) + [0xFEFF, 0xFFF9, 0xFFFA, 0xFFFB]
+    if not chr(code_point).isprintable()
+)
+
+def _iter_chunks(text: str, size: int):
+    """Yields slices of roughly `size` characters, always cut at whitespace."""
+    start, length = 0, len(text)
+    while start < length:
+        end = start + size
+        if end < length:
+            match = _WHITESPACE_RE.search(text, end)
+            end = match.start() if match else length
+        yield text[start:end]
+        start = end
+
+def _normalize_chunk(chunk: str) -> str:
+    """Collapses whitespace runs to single spaces and deletes non-printable characters."""
+    text = " ".join(chunk.split())
+    if not text.isprintable():
+        text = _NON_PRINTABLE_RE.sub('', text)
+        if not text.isprintable():
+            text = "".join(char for char in text if char.isprintable())
+    return text
+
+def _normalize_block(block: str) -> str:
+    """Normalizes one block, slicing very large blocks so temporary word lists stay small."""
+    if len(block) <= _NORMALIZE_CHUNK_CHARS:
+        return _normalize_chunk(block)
+    pieces = (_normalize_chunk(chunk) for chunk in _iter_chunks(block, _NORMALIZE_CHUNK_CHARS))
+    return " ".join(piece for piece in pieces if piece)
 
 def _process_text_pipeline(raw_text: str) -> dict:
     """
     An advanced text processing pipeline that cleans, normalizes,
     and prepares content for AI analysis.
+    Text is handled one block at a time: short blocks are dropped before any
+    normalization work is spent on them, and the survivors are joined by newlines.
+    Headings are kept as lines of their own, so the outline can guide chunking.
     """
-    text = re.sub(r'\s+', ' ', raw_text).strip()
-    text = "".join(filter(lambda char: char.isprintable(), text))
-    lines = (line.strip() for line in text.splitlines())
-    text = "\n".join(line for line in lines if len(line.split()) > 3)
-    detected_language = 'unknown'
-    try:
-        if text:
-            detected_language = detect(text[:500])
-    except LangDetectException:
-        print("Language detection failed.")
+    blocks = []
+    with span('normalize'):
+        for block in raw_text.split(BLOCK_SEPARATOR):
+            if block.lstrip(' ').startswith(HEADING_MARKER):
+                block = _normalize_block(block)
+                if block:
+                    blocks.append(block)
+                continue
+            # Cheap pre-check on the raw block: it cannot reach the word minimum
+            if len(block.split(None, MIN_BLOCK_WORDS - 1)) < MIN_BLOCK_WORDS:
+                continue
+            block = _normalize_block(block)
+            if len(block.split(None, MIN_BLOCK_WORDS - 1)) >= MIN_BLOCK_WORDS:
+                blocks.append(block)
+        text = "\n".join(blocks)
+    with span('language_detection'):
+        detected_language = language_detector.detect(text) if text else 'unknown'
     return {'cleaned_text': text, 'detected_language': detected_language}
 
-def extract_and_clean_content(html_content: str) -> dict:
+def extract_and_clean_content(html_content: str, backend: Optional[str] = None) -> dict:
     """
     Main function to extract, process, and analyze content from raw HTML.
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    # --- Step 1: Perform document structure analysis ---
-    structure_analysis = _analyze_document_structure(soup)
-
-    # --- Step 2: Extract and clean main text content ---
-    title = soup.title.string.strip() if soup.title else None
-    description_tag = soup.find('meta', attrs={'name': 'description'})
-    meta_description = description_tag.get('content', '').strip() if description_tag else None
-    
-    main_content_area = soup.find('article') or soup.find('main') or soup.body
-    if main_content_area:
-        for element in main_content_area(['nav', 'header', 'footer', 'aside', 'script', 'style']):
-            element.decompose()
-    
-    raw_text = main_content_area.get_text(separator=' ', strip=True) if main_content_area else ""
-    processed_text_data = _process_text_pipeline(raw_text)
-
-    # --- Step 3: Assemble the final output ---
-    final_output = {
-        "title": title,
-        "meta_description": meta_description,
-        "main_content_text": processed_text_data['cleaned_text'],
-        "detected_language": processed_text_data['detected_language']
-    }
-    # Merge the structure analysis results into the final dictionary
-    final_output.update(structure_analysis)
-    
-    return final_output
\ No newline at end of file
+    extractor = HTMLContentExtractor(backend)
+    extractor.feed(html_content)
+    return extractor.close()
@@ -0,0 +1,61 @@
+import multiprocessing
+from .content_extractor import extract_and_clean_content
+from .language_detector import load_language_profiles
+from ..utils.metrics import collect_spans, record_spans
+from ..utils.process_pool import SelfHealingProcessPool
+
+# A small but complete page, used to exercise the parser and text pipeline in each worker
+_WARM_UP_HTML = (
+    "<html><head><title>Warm up</title></head><body><article><h1>Warm up</h1>"
+    "<p>This short document loads the parser backend and language profiles in every worker process.</p>"
+    "</article></body></html>"
+)
+
+def _extract_with_spans(html_content: str) -> tuple:
+    """Runs in a worker: returns the extraction result and the stage spans measured for it."""
+    with collect_spans() as spans:
+        result = extract_and_clean_content(html_content)
+    return result, spans
+
+def _warm_up_worker() -> int:
+    extract_and_clean_content(_WARM_UP_HTML)
+    return multiprocessing.current_process().pid
+
+class ExtractionPool:
+    """
+    Runs extract_and_clean_content in a pool of worker processes so CPU-heavy
+    parsing scales with cores and never holds the event loop or the GIL of the
+    API process. Only the HTML string goes in and the compact result dict
+    comes back; the parse tree never crosses the process boundary.
+    A pool broken by a dead worker is replaced and warmed up again.
+    """
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.pool = SelfHealingProcessPool(
+            max_workers, 'extraction', initializer=load_language_profiles,
+            # Not waited for: a retried extraction queues behind the warm-up in the new workers
+            on_replace=self._submit_warm_up,
+        )
+
+    def warm_up(self):
+        """
+        Starts every worker and runs one extraction in each, so the first real
+        requests do not pay for process start-up and module imports.
+        """
+        for future in self._submit_warm_up():
+            future.result()
+
+    def _submit_warm_up(self) -> list:
+        return [self.pool.submit(_warm_up_worker) for _ in range(self.max_workers)]
+
+    async def extract(self, html_content: str) -> dict:
+        """
+        Extracts content from HTML in a worker process. The worker's stage spans
+        are recorded here, so they count towards this process's request and metrics.
+        """
+        result, spans = await self.pool.run(_extract_with_spans, html_content)
+        record_spans(spans)
+        return result
+
+    def shutdown(self):
+        self.pool.shutdown()
@@ -0,0 +1,75 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from langdetect.detector_factory import DetectorFactory, PROFILES_DIRECTORY
+from langdetect.lang_detect_exception import LangDetectException
+from ..config import settings
+
+# Detection only looks at the start of the text; longer samples cost more without helping
+DETECTION_SAMPLE_CHARS = 500
+
+class LanguageDetector:
+    """
+    Deterministic language detection on top of langdetect.
+    Profiles are loaded once, up front, into a private factory with a fixed
+    seed, so the same text always yields the same language. Results are
+    memoized by a hash of the sampled text.
+    """
+    def __init__(self, seed: int = 0, memo_size: int = 4096):
+        self.seed = seed
+        self.memo_size = memo_size
+        self._factory = None
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load_profiles(self):
+        """Loads the language profiles; safe to call more than once."""
+        with self._lock:
+            if self._factory is None:
+                factory = DetectorFactory()
+                factory.load_profile(PROFILES_DIRECTORY)
+                factory.set_seed(self.seed)
+                self._factory = factory
+
+    def _sample_key(self, sample: str) -> bytes:
+        return hashlib.blake2b(sample.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+    def _detect_uncached(self, sample: str) -> str:
+        detector = self._factory.create()
+        detector.append(sample)
+        try:
+            return detector.detect()
+        except LangDetectException:
+            print("Language detection failed.")
+            return 'unknown'
+
+    def detect(self, text: str) -> str:
+        """
+        Returns the ISO 639-1 code of the text's language, or 'unknown'.
+        """
+        sample = text[:DETECTION_SAMPLE_CHARS]
+        if not sample.strip():
+            return 'unknown'
+        if self._factory is None:
+            self.load_profiles()
+
+        key = self._sample_key(sample)
+        with self._lock:
+            language = self._memo.get(key)
+            if language is not None:
+                self._memo.move_to_end(key)
+                return language
+
+        language = self._detect_uncached(sample)
+        with self._lock:
+            self._memo[key] = language
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return language
+
+# One detector per process: profiles are large and identical everywhere
+language_detector = LanguageDetector(seed=settings.LANGDETECT_SEED, memo_size=settings.LANGDETECT_MEMO_SIZE)
+
+def load_language_profiles():
+    """Preloads the shared detector; usable as a process-pool initializer."""
+    language_detector.load_profiles()
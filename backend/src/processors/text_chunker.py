@@ -0,0 +1,63 @@
+from typing import Iterable, List
+
+def _split_oversized(text: str, max_chars: int) -> List[str]:
+    """Cuts a single over-long block at whitespace into pieces of at most `max_chars`."""
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind(' ', 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(text[:cut].strip())
+        text = text[cut:].strip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+def _squeeze(text: str) -> str:
+    # Outline entries join a heading's text nodes without spaces, the content text with them
+    return "".join(text.split())
+
+def _sections(lines: List[str], heading_texts: set) -> List[List[str]]:
+    """Groups lines into sections, starting a new one at every line that is a known heading."""
+    sections = [[]]
+    for line in lines:
+        if _squeeze(line) in heading_texts and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return [section for section in sections if section]
+
+def split_into_chunks(text: str, max_chars: int, headings: Iterable[str] = ()) -> List[str]:
+    """
+    Splits cleaned main-content text (one block per line) into chunks of at most
+    `max_chars`. Cuts are placed at outline headings where possible, then at
+    paragraph boundaries, and only inside a paragraph when one is itself too long.
+    """
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    heading_texts = {_squeeze(heading) for heading in headings if heading and heading.strip()}
+    lines = [line for line in text.split('\n') if line.strip()]
+
+    # Units are whole sections when they fit, otherwise their paragraphs (split further if needed)
+    units = []
+    for section in _sections(lines, heading_texts):
+        section_text = "\n".join(section)
+        if len(section_text) <= max_chars:
+            units.append(section_text)
+            continue
+        for line in section:
+            units.extend(_split_oversized(line, max_chars) if len(line) > max_chars else [line])
+
+    # Greedily pack consecutive units into chunks
+    chunks, current, current_size = [], [], 0
+    for unit in units:
+        added = len(unit) + (1 if current else 0)
+        if current and current_size + added > max_chars:
+            chunks.append("\n".join(current))
+            current, current_size = [], 0
+            added = len(unit)
+        current.append(unit)
+        current_size += added
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
@@ -1,27 +1,138 @@
-import google.generativeai as genai
+import asyncio
+import hashlib
 import json
+import time
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
 from ..config import settings
 from ..models.data_models import AIAnalysis  # Import the new, comprehensive model
+from ..processors.text_chunker import split_into_chunks
+from ..utils.cache import TieredCache
+from ..utils.metrics import queued, span
+from ..utils.single_flight import SingleFlight
 
-# Configure the Gemini client
-if settings.GOOGLE_API_KEY:
-    genai.configure(api_key=settings.GOOGLE_API_KEY)
-else:
+if not settings.GOOGLE_API_KEY:
     raise ValueError("GOOGLE_API_KEY is not set in the environment variables.")
 
+MODEL_NAME = 'gemini-1.5-flash-latest'
+# Bump whenever the prompts below change so cached analyses from the old prompts are ignored
+PROMPT_VERSION = '2'
+MAX_PROMPT_CHARS = 15000
+# Rough characters-per-token ratio used to turn the token budget into a text length
+CHARS_PER_TOKEN = 4
+
+def _create_model():
+    # Imported here rather than at the top: the Gemini SDK takes longer to
+    # import than the rest of the API together, and start-up should not wait for it
+    import google.generativeai as genai
+    genai.configure(api_key=settings.GOOGLE_API_KEY)
+    return genai.GenerativeModel(MODEL_NAME)
+
+class _ResponseFeed:
+    """
+    The text of one streamed Gemini response as it arrives. Every stream
+    sharing the analysis follows it, replaying what was written before it joined.
+    """
+    def __init__(self):
+        self.parts: List[str] = []
+        self.finished = False
+        self._changed = asyncio.Event()
+
+    def append(self, text: str):
+        self.parts.append(text)
+        self._notify()
+
+    def finish(self):
+        self.finished = True
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self.parts):
+                yield self.parts[index]
+                index += 1
+            if self.finished:
+                return
+            await changed.wait()
+
 class AnalysisService:
     """
     A comprehensive AI analysis engine that performs multi-faceted content analysis.
     """
     def __init__(self):
-        self.model = genai.GenerativeModel('gemini-1.5-flash-latest')
+        self._model = None
+        self.cache = None
+        if settings.ANALYSIS_CACHE_ENABLED:
+            self.cache = TieredCache(
+                path=settings.ANALYSIS_CACHE_PATH,
+                namespace='ai_analysis',
+                ttl_seconds=settings.ANALYSIS_CACHE_TTL_SECONDS,
+                memory_max_entries=settings.ANALYSIS_CACHE_MEMORY_ENTRIES,
+                disk_max_entries=settings.ANALYSIS_CACHE_DISK_ENTRIES,
+            )
+        # Caps concurrent Gemini calls across every caller on this worker
+        self.llm_slots = asyncio.Semaphore(settings.LLM_MAX_IN_FLIGHT)
+        # Analyses in progress, by cache key: identical content found under different URLs is analyzed once
+        self.in_flight = SingleFlight('content')
+        # Response feeds of the in-flight analyses that were started by a stream, by cache key
+        self._response_feeds: Dict[str, _ResponseFeed] = {}
+        # Running totals used to estimate the LLM time saved by cache hits
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    @property
+    def model(self):
+        """The Gemini model, created on the first analysis."""
+        if self._model is None:
+            self._model = _create_model()
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
 
-    def analyze_content(self, content: str) -> AIAnalysis:
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+
+    def _input_limit(self) -> int:
+        """How much of the content is analyzed at all: the token budget in chunked mode."""
+        if settings.ANALYSIS_CHUNKED_MODE:
+            return max(MAX_PROMPT_CHARS, settings.ANALYSIS_TOKEN_BUDGET * CHARS_PER_TOKEN)
+        return MAX_PROMPT_CHARS
+
+    def _cache_key(self, content: str) -> str:
+        """Content-addressed key: the exact text analyzed plus model and prompt version."""
+        digest = hashlib.sha256()
+        digest.update(f"{MODEL_NAME}\0{PROMPT_VERSION}\0{self._input_limit()}\0".encode('utf-8'))
+        digest.update(content[:self._input_limit()].encode('utf-8'))
+        return digest.hexdigest()
+
+    def get_cache_stats(self) -> dict:
         """
-        Analyzes content across multiple dimensions and returns a structured Pydantic model.
+        Returns cache hit/miss counters along with an estimate of the LLM time they saved.
         """
+        if self.cache is None:
+            return {'enabled': False}
+        stats = self.cache.get_stats()
+        average_llm_seconds = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+        stats.update({
+            'enabled': True,
+            'llm_calls': self.llm_calls,
+            'average_llm_seconds': round(average_llm_seconds, 3),
+            'estimated_llm_seconds_saved': round((stats['memory_hits'] + stats['disk_hits']) * average_llm_seconds, 3),
+        })
+        return stats
+
+    def _build_prompt(self, content: str) -> str:
         # A new, highly-detailed prompt to generate the multi-faceted report
-        prompt = f"""
+        return f"""
         Analyze the following website content and generate a comprehensive, multi-faceted report.
         The report MUST be a single, valid JSON object with the exact following structure:
         {{
@@ -45,22 +156,189 @@ class AnalysisService:
 
         Website Content to Analyze:
         ---
-        {content[:15000]}
+        {content[:MAX_PROMPT_CHARS]}
         ---
 
         Provide ONLY the raw JSON object in your response. Do not include markdown formatting like ```json.
         """
-        try:
-            response = self.model.generate_content(prompt)
+
+    async def _generate(self, prompt: str) -> str:
+        """
+        Sends one prompt to Gemini through the SDK's async API, waiting for a free
+        in-flight slot first. Raises TimeoutError if the call exceeds LLM_TIMEOUT_SECONDS;
+        cancelling the awaiting task aborts the underlying request.
+        """
+        async with queued(self.llm_slots, 'llm_queue'):
+            started = time.perf_counter()
+            with span('llm'):
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, request_options={'timeout': settings.LLM_TIMEOUT_SECONDS}),
+                    timeout=settings.LLM_TIMEOUT_SECONDS,
+                )
+            self.llm_seconds += time.perf_counter() - started
+            self.llm_calls += 1
+        return response.text
+
+    def _build_section_prompt(self, section: str, index: int, total: int) -> str:
+        return f"""
+        You are reading part {index} of {total} of a long web page. Write compact analyst notes on this part only:
+        its main points, the topics and keywords it covers, its sentiment and tone, and any claims about the
+        company's products, audience or competitive position. Use at most 200 words of plain text.
+
+        Page Content (part {index} of {total}):
+        ---
+        {section}
+        ---
+        """
+
+    async def _summarize_sections(self, content: str, headings: Iterable[str]) -> str:
+        """
+        Map step of chunked mode: splits the content on outline/paragraph boundaries,
+        summarizes every chunk concurrently, and joins the notes in page order.
+        """
+        chunks = split_into_chunks(content[:self._input_limit()], MAX_PROMPT_CHARS, headings)
+        notes = await asyncio.gather(*(
+            self._generate(self._build_section_prompt(chunk, index, len(chunks)))
+            for index, chunk in enumerate(chunks, start=1)
+        ))
+        header = "This page was too long to read in one pass. Below are notes covering each part of it, in order."
+        # Each part gets an equal share of the final prompt, so long-winded notes on the
+        # first parts cannot push the last ones past MAX_PROMPT_CHARS
+        share = (MAX_PROMPT_CHARS - len(header)) // len(notes) - 2
+        sections = []
+        for index, note in enumerate(notes, start=1):
+            label = f"Notes on part {index}:\n"
+            sections.append(label + note.strip()[:max(0, share - len(label))])
+        return header + "\n\n" + "\n\n".join(sections)
+
+    async def _generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Streaming counterpart of _generate: yields the response text as Gemini
+        produces it, under the same in-flight slot and overall deadline.
+        """
+        async with queued(self.llm_slots, 'llm_queue'):
+            started = time.perf_counter()
+            deadline = started + settings.LLM_TIMEOUT_SECONDS
+            with span('llm'):
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, stream=True, request_options={'timeout': settings.LLM_TIMEOUT_SECONDS}),
+                    timeout=settings.LLM_TIMEOUT_SECONDS,
+                )
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=max(0.0, deadline - time.perf_counter()))
+                    except StopAsyncIteration:
+                        break
+                    if chunk.text:
+                        yield chunk.text
+            self.llm_seconds += time.perf_counter() - started
+            self.llm_calls += 1
+
+    async def _prepare_prompt(self, content: str, headings: Iterable[str]) -> str:
+        """Builds the analysis prompt, map-reducing long content first in chunked mode."""
+        if settings.ANALYSIS_CHUNKED_MODE and len(content) > MAX_PROMPT_CHARS:
+            content = await self._summarize_sections(content, headings)
+        return self._build_prompt(content)
+
+    def _parse_response(self, response_text: str) -> AIAnalysis:
+        with span('validate_analysis'):
             # Clean the response to ensure it's a valid JSON string
-            cleaned_response_text = response.text.strip().replace('```json', '').replace('```', '')
+            cleaned_response_text = response_text.strip().replace('```json', '').replace('```', '')
             analysis_data = json.loads(cleaned_response_text)
 
             # Validate the data by parsing it with the Pydantic model
             # This ensures the LLM's output matches our required structure
-            validated_analysis = AIAnalysis.parse_obj(analysis_data)
-            return validated_analysis
+            return AIAnalysis.parse_obj(analysis_data)
 
+    @contextmanager
+    def _translate_errors(self):
+        """Maps Gemini, JSON and validation failures to the errors the API reports."""
+        try:
+            yield
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"The AI analysis did not finish within {settings.LLM_TIMEOUT_SECONDS:g} seconds.")
         except Exception as e:
             print(f"Error during Gemini analysis or Pydantic validation: {e}")
-            raise ValueError(f"Failed to generate or validate the AI analysis. The LLM response may have been malformed.")
\ No newline at end of file
+            raise ValueError(f"Failed to generate or validate the AI analysis. The LLM response may have been malformed.")
+
+    async def _get_cached(self, cache_key: str) -> Optional[AIAnalysis]:
+        if self.cache is None:
+            return None
+        with span('analysis_cache'):
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            return AIAnalysis.parse_raw(cached) if cached is not None else None
+
+    async def _store_cached(self, cache_key: str, analysis: AIAnalysis):
+        if self.cache is not None:
+            with span('analysis_cache'):
+                await asyncio.to_thread(self.cache.set, cache_key, analysis.json())
+
+    async def analyze_content(self, content: str, headings: Iterable[str] = ()) -> AIAnalysis:
+        """
+        Analyzes content across multiple dimensions and returns a structured Pydantic model.
+        Identical content is served from the result cache without calling Gemini.
+        In chunked mode, content longer than one prompt is map-reduced: each chunk is
+        summarized in parallel and a final call builds the analysis from the notes.
+        `headings` (the document outline) guides where chunks are cut.
+        Concurrent calls with identical content share one analysis.
+        """
+        cache_key = self._cache_key(content)
+        return await self.in_flight.run(cache_key, lambda: self._start_analysis(cache_key, content, headings, streamed=False))
+
+    def _start_analysis(self, cache_key: str, content: str, headings: Iterable[str], streamed: bool):
+        """
+        Begins the shared analysis for `cache_key`. A streamed one publishes the
+        model output on a feed that every stream joining it follows.
+        """
+        feed = _ResponseFeed() if streamed else None
+        if feed is not None:
+            self._response_feeds[cache_key] = feed
+        else:
+            # Drop the feed of a cancelled streamed run that has not wound down yet
+            self._response_feeds.pop(cache_key, None)
+        return self._analyze_once(cache_key, content, headings, feed)
+
+    async def _analyze_once(self, cache_key: str, content: str, headings: Iterable[str],
+                            feed: Optional[_ResponseFeed] = None) -> AIAnalysis:
+        try:
+            cached = await self._get_cached(cache_key)
+            if cached is not None:
+                return cached
+
+            with self._translate_errors():
+                prompt = await self._prepare_prompt(content, headings)
+                if feed is None:
+                    response_text = await self._generate(prompt)
+                else:
+                    async for text in self._generate_stream(prompt):
+                        feed.append(text)
+                    response_text = "".join(feed.parts)
+                validated_analysis = self._parse_response(response_text)
+            await self._store_cached(cache_key, validated_analysis)
+            return validated_analysis
+        finally:
+            if feed is not None:
+                feed.finish()
+                if self._response_feeds.get(cache_key) is feed:
+                    del self._response_feeds[cache_key]
+
+    async def analyze_content_stream(self, content: str, headings: Iterable[str] = ()) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Same analysis as analyze_content, but yields ('delta', text) events while the
+        model is still writing, followed by a final ('analysis', AIAnalysis) event.
+        Streams of identical content share one analysis, and each receives every
+        delta of it; analyze_content calls join it as well. A cache hit, or joining
+        an analysis started by analyze_content, yields only the final event.
+        """
+        cache_key = self._cache_key(content)
+        call = self.in_flight.join(cache_key, lambda: self._start_analysis(cache_key, content, headings, streamed=True))
+        try:
+            feed = self._response_feeds.get(cache_key)
+            if feed is not None:
+                async for text in feed.follow():
+                    yield 'delta', text
+            analysis = await asyncio.shield(call.task)
+        finally:
+            self.in_flight.leave(cache_key, call)
+        yield 'analysis', analysis
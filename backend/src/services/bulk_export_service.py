@@ -0,0 +1,136 @@
+import asyncio
+import csv
+import io
+import zipfile
+from typing import AsyncIterator, List, Optional, Tuple
+from urllib.parse import urlparse
+from ..models.data_models import AnalysisReport
+from ..utils.metrics import span
+from .render_pool import PDFRenderPool
+from .report_store import ReportStore
+
+# Columns of the combined CSV. The page text is left out: it would dwarf everything else.
+CSV_COLUMNS = [
+    'entry', 'report_id', 'url', 'title', 'content_type', 'detected_language',
+    'sentiment', 'tone', 'summary', 'key_points', 'topics', 'target_keywords',
+    'seo_recommendations', 'readability', 'competitive_positioning',
+]
+
+class _ZipSink(io.RawIOBase):
+    """
+    Write-only, unseekable file object for zipfile. Entries are written with
+    data descriptors, and the bytes are drained after each entry, so the
+    archive never has to exist in memory as a whole.
+    """
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _entry_name(index: int, report: AnalysisReport) -> str:
+    host = urlparse(str(report.url)).hostname or 'report'
+    return f"{index:04d}_{host}.pdf"
+
+def _csv_row(index: int, report: AnalysisReport) -> list:
+    content, ai = report.content_analysis, report.ai_summary
+    return [
+        _entry_name(index, report), report.report_id or '', str(report.url), content.title or '',
+        content.content_type, content.detected_language, ai.sentiment_analysis.sentiment,
+        ai.sentiment_analysis.tone, ai.summary, "; ".join(ai.key_points), "; ".join(ai.topic_identification),
+        "; ".join(ai.seo_analysis.target_keywords), "; ".join(ai.seo_analysis.recommendations),
+        ai.readability.score_description, ai.competitive_positioning,
+    ]
+
+class BulkExportService:
+    """
+    Exports many reports as one ZIP archive: a PDF per report plus a combined
+    CSV. PDFs are rendered in the render pool, a bounded window at a time, and
+    each one is streamed out as soon as it is ready.
+    """
+    def __init__(self, report_store: ReportStore, render_pool: Optional[PDFRenderPool] = None, window: int = 4):
+        self.report_store = report_store
+        self.render_pool = render_pool
+        # Reports rendered at once; also bounds how many reports and PDFs sit in memory
+        self.window = window
+
+    async def _render(self, report: AnalysisReport) -> bytes:
+        with span('pdf_render'):
+            if self.render_pool is not None:
+                return await self.render_pool.render(report)
+            return await asyncio.to_thread(self.report_store.renderer.generate_report, report)
+
+    async def _export_one(self, index: int, report_id: Optional[str], report: Optional[AnalysisReport]) -> Tuple:
+        """Returns (index, report, pdf_bytes, error) for one archive entry."""
+        try:
+            if report_id is None:
+                return index, report, await self._render(report), None
+
+            report = await self.report_store.get(report_id)
+            if report is None:
+                return index, None, None, f"report {report_id} was not found or has expired"
+            pdf_bytes = await self.report_store.get_cached_pdf(report_id)
+            if pdf_bytes is None:
+                pdf_bytes = await self._render(report)
+                await self.report_store.cache_pdf(report_id, pdf_bytes)
+            return index, report, pdf_bytes, None
+        except Exception as e:
+            print(f"Bulk export failed for entry {index}: {e}")
+            return index, None, None, f"failed to render: {e}"
+
+    async def stream_zip(self, report_ids: List[str], reports: List[AnalysisReport]) -> AsyncIterator[bytes]:
+        """
+        Yields the ZIP archive in chunks. PDFs are added in completion order,
+        numbered by their position in the request. Entries that fail are listed
+        in errors.txt instead of aborting the export.
+        """
+        jobs = iter([(index, report_id, None) for index, report_id in enumerate(report_ids, start=1)]
+                    + [(index, None, report) for index, report in enumerate(reports, start=len(report_ids) + 1)])
+        sink = _ZipSink()
+        csv_buffer = io.StringIO()
+        csv_writer = csv.writer(csv_buffer)
+        csv_writer.writerow(CSV_COLUMNS)
+        errors = []
+        pending = set()
+        try:
+            with zipfile.ZipFile(sink, 'w') as archive:
+                while True:
+                    while len(pending) < self.window:
+                        job = next(jobs, None)
+                        if job is None:
+                            break
+                        pending.add(asyncio.create_task(self._export_one(*job)))
+                    if not pending:
+                        break
+
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        index, report, pdf_bytes, error = task.result()
+                        if error is not None:
+                            errors.append(f"entry {index:04d}: {error}")
+                            continue
+                        # PDF streams are already compressed
+                        archive.writestr(_entry_name(index, report), pdf_bytes, compress_type=zipfile.ZIP_STORED)
+                        csv_writer.writerow(_csv_row(index, report))
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+
+                archive.writestr('reports.csv', csv_buffer.getvalue(), compress_type=zipfile.ZIP_DEFLATED)
+                if errors:
+                    archive.writestr('errors.txt', "\n".join(errors) + "\n", compress_type=zipfile.ZIP_DEFLATED)
+            # Closing the archive wrote the central directory
+            yield sink.drain()
+        finally:
+            # The client went away mid-download: stop rendering the rest
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,275 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional
+from ..config import settings
+from ..utils.metrics import record_spans
+from .pipeline_service import AnalysisPipeline, describe_pipeline_error
+from .report_store import ReportStore
+from .scraping_service import OriginUnavailableError
+
+# Claimed highest first; stored as integers so the queue can sort on them
+PRIORITIES = {'low': 0, 'normal': 1, 'high': 2}
+PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
+
+@dataclass
+class Job:
+    id: str
+    url: str
+    priority: str
+    status: str  # queued, running, succeeded or failed
+    attempts: int
+    created_at: float
+    updated_at: float
+    run_after: float
+    report_id: Optional[str] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    lease_token: Optional[str] = None  # identifies the claim that holds the lease while running
+
+_JOB_COLUMNS = "id, url, priority, status, attempts, created_at, updated_at, run_after, report_id, error, status_code, lease_token"
+
+def _job_from_row(row) -> Job:
+    job = Job(*row)
+    job.priority = PRIORITY_NAMES.get(job.priority, 'normal')
+    return job
+
+class JobQueue:
+    """
+    A persistent analysis job queue in SQLite, shared by every API and worker
+    process that points at the same file. Jobs are claimed atomically, highest
+    priority first and oldest first within a priority. A claimed job holds a
+    lease; if its worker dies, the lease runs out and another worker picks
+    the job up again, so no job is lost to a restart. Every claim gets a new
+    lease token, and only the holder of the current token can renew the lease
+    or record the outcome, so a worker that lost its lease cannot overwrite
+    the result of the one that took the job over.
+    """
+    def __init__(self, path: str, lease_seconds: float):
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, url TEXT NOT NULL, priority INTEGER NOT NULL, status TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+            "run_after REAL NOT NULL, lease_expires_at REAL, report_id TEXT, error TEXT, status_code INTEGER, "
+            "lease_token TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if 'lease_token' not in columns:  # queue files created before lease tokens
+            self._db.execute("ALTER TABLE jobs ADD COLUMN lease_token TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, priority DESC, created_at)")
+
+    def enqueue(self, url: str, priority: str = 'normal') -> Job:
+        now = time.time()
+        job = Job(uuid.uuid4().hex, url, priority, 'queued', 0, now, now, now)
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO jobs ({_JOB_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL, NULL, NULL)",
+                (job.id, url, PRIORITIES[priority], job.status, 0, now, now, now)
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job_from_row(row) if row else None
+
+    def claim(self) -> Optional[Job]:
+        """
+        Marks the next runnable job as running and returns it, or None when
+        nothing is due. Runnable means queued and past its retry delay, or
+        running under a lease that has expired.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_expires_at = ?, lease_token = ?, "
+                "updated_at = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE (status = 'queued' AND run_after <= ?) "
+                "OR (status = 'running' AND lease_expires_at < ?) ORDER BY priority DESC, created_at LIMIT 1) "
+                f"RETURNING {_JOB_COLUMNS}",
+                (now + self.lease_seconds, uuid.uuid4().hex, now, now, now)
+            ).fetchall()
+        return _job_from_row(rows[0]) if rows else None
+
+    def extend_lease(self, job: Job) -> bool:
+        """Renews the job's lease. Returns False if the lease was lost to another worker."""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND status = 'running' AND lease_token = ?",
+                (now + self.lease_seconds, job.id, job.lease_token)
+            )
+        return cursor.rowcount > 0
+
+    def _finish(self, job: Job, status: str, run_after: float = 0.0, report_id: Optional[str] = None,
+                error: Optional[str] = None, status_code: Optional[int] = None, attempts_delta: int = 0) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, run_after = ?, report_id = ?, error = ?, status_code = ?, "
+                "attempts = attempts + ?, lease_expires_at = NULL, lease_token = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'running' AND lease_token = ?",
+                (status, run_after or now, report_id, error, status_code, attempts_delta, now, job.id, job.lease_token)
+            )
+        return cursor.rowcount > 0
+
+    # Each of these returns False, and changes nothing, if the job's lease was lost to another worker
+
+    def succeed(self, job: Job, report_id: str) -> bool:
+        return self._finish(job, 'succeeded', report_id=report_id)
+
+    def fail(self, job: Job, error: str, status_code: int) -> bool:
+        return self._finish(job, 'failed', error=error, status_code=status_code)
+
+    def retry(self, job: Job, error: str, status_code: int, delay: float) -> bool:
+        """Puts a job back in the queue after a transient failure, due again in `delay` seconds."""
+        return self._finish(job, 'queued', run_after=time.time() + delay, error=error, status_code=status_code)
+
+    def release(self, job: Job) -> bool:
+        """Returns an interrupted job to the queue without counting the attempt."""
+        return self._finish(job, 'queued', attempts_delta=-1)
+
+    def purge(self, older_than: float) -> int:
+        """Deletes finished jobs last updated before `older_than` (a timestamp)."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?", (older_than,)
+            )
+        return max(cursor.rowcount, 0)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def is_transient_failure(error: Exception, status_code: int) -> bool:
+    """
+    Whether a failed job may succeed if run again later: timeouts and unexpected
+    errors (5xx outcomes), and sites that were down or answered 429/5xx on every
+    fetch attempt. Bad or blocked URLs, 4xx pages and unusable content are final.
+    """
+    return status_code >= 500 or isinstance(error, OriginUnavailableError)
+
+class JobWorkers:
+    """
+    Runs queued jobs through the analysis pipeline with `workers` concurrent
+    asyncio tasks. A job that fails transiently (see is_transient_failure) is
+    retried with exponential backoff, never sooner than the site's Retry-After,
+    up to JOB_MAX_ATTEMPTS attempts in all; other failures are final. Results
+    are saved in the report store and the job keeps the report ID.
+    """
+    # Finished jobs are purged at most this often, when a worker finds the queue empty
+    PURGE_INTERVAL_SECONDS = 600
+
+    def __init__(self, queue: JobQueue, pipeline: AnalysisPipeline, report_store: ReportStore, workers: int):
+        self.queue = queue
+        self.pipeline = pipeline
+        self.report_store = report_store
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        self._purged_at = 0.0
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Cancels the workers. Jobs they were running go back to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_forever(self):
+        self.start()
+        await asyncio.gather(*self._tasks)
+
+    async def _queue_call(self, method, *args):
+        """
+        Runs a queue method in a thread. A database error (such as a lock held
+        past the timeout) is logged and returns None, so it never ends a worker.
+        """
+        try:
+            return await asyncio.to_thread(method, *args)
+        except sqlite3.Error as e:
+            print(f"Job queue unavailable ({method.__name__}): {e}")
+            return None
+
+    async def _work(self):
+        while True:
+            try:
+                await self._work_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A worker must outlive any single job; otherwise the pool quietly shrinks
+                print(f"Job worker error: {e}")
+                await asyncio.sleep(settings.JOB_POLL_SECONDS)
+
+    async def _work_once(self):
+        job = await self._queue_call(self.queue.claim)
+        if job is None:
+            await self._purge_if_due()
+            await asyncio.sleep(settings.JOB_POLL_SECONDS)
+            return
+        if job.attempts > settings.JOB_MAX_ATTEMPTS:
+            # Its lease kept running out: the worker running it died every time
+            await self._queue_call(self.queue.fail, job, "The job was interrupted too many times.", 500)
+            return
+        # Time from becoming due to being picked up, i.e. how far behind the workers are
+        record_spans([('job_queue', max(0.0, time.time() - job.run_after), None)])
+        await self._run(job)
+
+    async def _purge_if_due(self):
+        if time.monotonic() - self._purged_at < self.PURGE_INTERVAL_SECONDS:
+            return
+        self._purged_at = time.monotonic()
+        await self._queue_call(self.queue.purge, time.time() - settings.JOB_RETENTION_SECONDS)
+
+    async def _run(self, job: Job):
+        task = asyncio.create_task(self._analyze(job))
+        try:
+            # Renew the lease while the job runs so no other worker takes it over
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.queue.lease_seconds / 3)
+                if done:
+                    break
+                if await self._queue_call(self.queue.extend_lease, job) is False:
+                    print(f"Job {job.id} was taken over by another worker after its lease ran out; abandoning it")
+                    return
+            report_id = task.result()
+        except asyncio.CancelledError:
+            await asyncio.shield(self._queue_call(self.queue.release, job))
+            raise
+        except Exception as e:
+            await self._record_failure(job, e)
+            return
+        finally:
+            # Whatever ends this run, the analysis must not carry on untracked
+            task.cancel()
+        if await self._queue_call(self.queue.succeed, job, report_id) is False:
+            print(f"Job {job.id} finished after another worker took it over; keeping that worker's outcome")
+
+    async def _record_failure(self, job: Job, error: Exception):
+        status_code, detail = describe_pipeline_error(error)
+        # The scraper's own retries are seconds apart; the job's backoff gives a site that is down time to recover
+        if is_transient_failure(error, status_code) and job.attempts < settings.JOB_MAX_ATTEMPTS:
+            delay = settings.JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+            delay = max(delay, getattr(error, 'retry_after', None) or 0.0)
+            print(f"Job {job.id} attempt {job.attempts} failed, retrying in {delay:g}s: {detail}")
+            await self._queue_call(self.queue.retry, job, detail, status_code, delay)
+        else:
+            print(f"Job {job.id} failed after {job.attempts} attempt(s): {detail}")
+            await self._queue_call(self.queue.fail, job, detail, status_code)
+
+    async def _analyze(self, job: Job) -> str:
+        report = await self.pipeline.analyze(job.url)
+        return await self.report_store.save(report)
@@ -0,0 +1,160 @@
+import asyncio
+from typing import AsyncIterator, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+from pydantic import ValidationError
+from ..config import settings
+from ..models.data_models import AIAnalysis, AnalysisReport, BatchAnalysisResult, ProcessedContent, URLAnalysisRequest
+from ..processors.content_extractor import extract_and_clean_content
+from ..processors.extraction_pool import ExtractionPool
+from ..utils.metrics import queued, span
+from ..utils.single_flight import SingleFlight
+from .scraping_service import FetchedPage, WebScraperService
+from .analysis_service import AnalysisService
+
+def describe_pipeline_error(error: Exception) -> Tuple[int, str]:
+    """
+    Maps a pipeline failure to the HTTP status code and message reported to clients.
+    """
+    if isinstance(error, (ValueError, ConnectionError)):
+        return 400, str(error)
+    if isinstance(error, TimeoutError):
+        return 504, str(error)
+    return 500, f"An unexpected error occurred in the analysis pipeline: {error}"
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def normalize_url(url: str) -> str:
+    """
+    The form of a URL used to spot duplicate requests: lowercase scheme and
+    host, no default port, no fragment, and "/" for an empty path. The query
+    string is kept as is, since parameter order can matter to a site.
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    if ':' in host:
+        host = f"[{host}]"
+    userinfo = parts.netloc.rpartition('@')[0]
+    netloc = (userinfo + '@' if userinfo else '') + host
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc += f":{port}"
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+class AnalysisPipeline:
+    """
+    Orchestrates fetch -> extract -> LLM analysis for one or many URLs.
+    Each stage has its own concurrency limit so a batch keeps every stage busy
+    without flooding the network, the CPU or the Gemini quota. Concurrent
+    requests for the same URL share one run of the pipeline.
+    """
+    def __init__(self, scraper: WebScraperService, analyzer: AnalysisService, extraction_pool: Optional[ExtractionPool] = None):
+        self.scraper = scraper
+        self.analyzer = analyzer
+        self.extraction_pool = extraction_pool
+        self.fetch_limit = asyncio.Semaphore(settings.PIPELINE_FETCH_CONCURRENCY)
+        self.extract_limit = asyncio.Semaphore(settings.PIPELINE_EXTRACT_CONCURRENCY)
+        # LLM concurrency is enforced inside AnalysisService (LLM_MAX_IN_FLIGHT)
+        # Runs in progress, by normalized URL
+        self.in_flight = SingleFlight('url')
+
+    async def _fetch(self, url: str) -> FetchedPage:
+        async with queued(self.fetch_limit, 'fetch_queue'):
+            return await self.scraper.fetch_page(url)
+
+    async def _extract(self, page: FetchedPage) -> ProcessedContent:
+        processed_data = page.extracted
+        if processed_data is None:
+            # Parsing is CPU-bound, so keep it off the event loop (and ideally out of this process)
+            async with queued(self.extract_limit, 'extract_queue'):
+                # Includes the hand-off to the worker process; parse and text stages are timed inside
+                with span('extract'):
+                    if page.extractor is not None:
+                        # The body was parsed while it streamed in; only finishing up remains
+                        processed_data = await asyncio.to_thread(page.extractor.close)
+                    elif self.extraction_pool is not None:
+                        processed_data = await self.extraction_pool.extract(page.html)
+                    else:
+                        processed_data = await asyncio.to_thread(extract_and_clean_content, page.html)
+            await self.scraper.remember_extraction(page, processed_data)
+
+        # Assemble the ProcessedContent model from the scraped data
+        with span('validate_content'):
+            return ProcessedContent.parse_obj(processed_data)
+
+    async def analyze(self, url: str) -> AnalysisReport:
+        """
+        Runs the full pipeline for a single URL and returns the final report.
+        A call for a URL that is already being analyzed waits for that run
+        instead of fetching and analyzing the page a second time.
+        """
+        content_analysis, ai_summary = await self.in_flight.run(normalize_url(url), lambda: self._run_stages(url))
+
+        # Assemble the final, comprehensive report; each caller gets its own, since routes set report_id on it
+        return AnalysisReport(
+            url=url,
+            content_analysis=content_analysis,
+            ai_summary=ai_summary
+        )
+
+    async def _run_stages(self, url: str) -> Tuple[ProcessedContent, AIAnalysis]:
+        content_analysis = await self._extract(await self._fetch(url))
+
+        # Send the main text to the AI for summary and analysis
+        ai_summary = await self.analyzer.analyze_content(
+            content_analysis.main_content_text,
+            headings=[heading.text for heading in content_analysis.document_outline]
+        )
+        return content_analysis, ai_summary
+
+    async def analyze_stream(self, url: str) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Runs the pipeline for one URL, yielding (event, payload) pairs as each stage
+        completes: 'fetched', 'extracted' (ProcessedContent), any number of
+        'llm_delta' chunks of raw model output, and finally 'analysis' (AIAnalysis).
+        """
+        page = await self._fetch(url)
+        yield 'fetched', {'url': url, 'not_modified': page.not_modified}
+
+        content_analysis = await self._extract(page)
+        yield 'extracted', content_analysis.dict()
+
+        async for kind, payload in self.analyzer.analyze_content_stream(
+            content_analysis.main_content_text,
+            headings=[heading.text for heading in content_analysis.document_outline]
+        ):
+            if kind == 'delta':
+                yield 'llm_delta', {'text': payload}
+            else:
+                yield 'analysis', payload.dict()
+
+    async def _analyze_for_batch(self, url: str) -> BatchAnalysisResult:
+        """Runs one batch entry, turning any failure, an invalid URL included, into an inline error result."""
+        try:
+            url = str(URLAnalysisRequest(url=url).url)
+        except ValidationError as e:
+            # Same status /analyze answers for an invalid URL
+            return BatchAnalysisResult(url=url, status_code=422, error=f"Invalid URL: {e.errors()[0]['msg']}")
+        try:
+            report = await self.analyze(url)
+            return BatchAnalysisResult(url=url, status_code=200, report=report)
+        except Exception as e:
+            status_code, detail = describe_pipeline_error(e)
+            return BatchAnalysisResult(url=url, status_code=status_code, error=detail)
+
+    async def analyze_batch(self, urls: List[str]) -> AsyncIterator[BatchAnalysisResult]:
+        """
+        Analyzes all URLs concurrently and yields each result as soon as it
+        finishes, in completion order rather than submission order.
+        """
+        tasks = [asyncio.create_task(self._analyze_for_batch(url)) for url in urls]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # The client went away mid-stream: stop the remaining work
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,26 @@
+from ..models.data_models import AnalysisReport
+from ..utils.process_pool import SelfHealingProcessPool
+from .report_service import PDFReportService
+
+def _render_pdf(report: AnalysisReport) -> bytes:
+    return PDFReportService().generate_report(report)
+
+class PDFRenderPool:
+    """
+    Renders PDF reports in a pool of worker processes, so a bulk export scales
+    with cores instead of rendering one report after another under the GIL.
+    Only the PDF bytes come back. A pool broken by a dead worker is replaced.
+    """
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        # Workers start on the first render, so exports that never happen cost nothing
+        self.pool = SelfHealingProcessPool(max_workers, 'PDF render')
+
+    async def render(self, report: AnalysisReport) -> bytes:
+        # The PDF never shows the page text, so it is not shipped to the worker
+        content = report.content_analysis.copy(update={'main_content_text': ''})
+        slim_report = report.copy(update={'content_analysis': content})
+        return await self.pool.run(_render_pdf, slim_report)
+
+    def shutdown(self):
+        self.pool.shutdown()
@@ -1,8 +1,16 @@
-import io
-import matplotlib.pyplot as plt
-from fpdf import FPDF
 from ..models.data_models import AnalysisReport, SentimentAnalysis
 
+# Where each sentiment sits on the chart's 0-10 scale; anything else is drawn as neutral
+SENTIMENT_SCORES = {'positive': 8.5, 'neutral': 5.0, 'negative': 2.0}
+# Chart size in mm, and its colours as RGB
+CHART_WIDTH = 150
+CHART_BAR_HEIGHT = 8
+WHITESMOKE = (245, 245, 245)
+FORESTGREEN = (34, 139, 34)
+CRIMSON = (220, 20, 60)
+GOLD = (255, 215, 0)
+AXIS_GREY = (128, 128, 128)
+
 class PDFReportService:
     """
     Creates professional, structured PDF reports from AI analysis results,
@@ -27,39 +35,51 @@ class PDFReportService:
     def _write_bullet_points(self, pdf, points):
         pdf.set_font("Arial", '', 11)
         for point in points:
-            pdf.multi_cell(0, 6, f"  •  {point}".encode('latin-1', 'replace').decode('latin-1'))
+            # Return to the left margin after each item, or the next one has no room to start
+            pdf.multi_cell(0, 6, f"  •  {point}".encode('latin-1', 'replace').decode('latin-1'), new_x="LMARGIN", new_y="NEXT")
         pdf.ln(5)
 
-    def _generate_sentiment_chart(self, sentiment_data: SentimentAnalysis) -> io.BytesIO:
+    def _draw_sentiment_chart(self, pdf, sentiment_data: SentimentAnalysis):
         """
-        Creates a simple horizontal bar chart for sentiment visualization.
+        Draws a horizontal sentiment bar on a 0-10 scale with FPDF's vector
+        primitives, so the chart costs a few hundred bytes and no rasterizing.
         """
         sentiment = sentiment_data.sentiment.lower()
-        score_map = {'positive': 8.5, 'neutral': 5.0, 'negative': 2.0}
-        score = score_map.get(sentiment, 5.0)
-        color = 'forestgreen' if score > 6 else 'crimson' if score < 4 else 'gold'
+        score = SENTIMENT_SCORES.get(sentiment, 5.0)
+        color = FORESTGREEN if score > 6 else CRIMSON if score < 4 else GOLD
+
+        # Keep the title, bar and scale together on one page
+        if pdf.get_y() + 25 > pdf.page_break_trigger:
+            pdf.add_page()
+        pdf.set_font("Arial", '', 11)
+        title = f"Sentiment Analysis: {sentiment.capitalize()}"
+        pdf.cell(0, 7, title.encode('latin-1', 'replace').decode('latin-1'), new_x="LMARGIN", new_y="NEXT")
 
-        fig, ax = plt.subplots(figsize=(6, 1))
+        x, y = pdf.l_margin, pdf.get_y() + 1
         # Background bar
-        ax.barh([0], [10], color='whitesmoke')
+        pdf.set_fill_color(*WHITESMOKE)
+        pdf.rect(x, y, CHART_WIDTH, CHART_BAR_HEIGHT, style='F')
         # Sentiment score bar
-        ax.barh([0], [score], color=color)
-        
-        ax.set_xlim(0, 10)
-        ax.set_yticks([])
-        ax.set_title(f"Sentiment Analysis: {sentiment.capitalize()}", loc='left')
-        plt.box(False) # Remove frame
-        
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-        buf.seek(0)
-        plt.close(fig)
-        return buf
+        pdf.set_fill_color(*color)
+        pdf.rect(x, y, CHART_WIDTH * score / 10, CHART_BAR_HEIGHT, style='F')
+
+        # Scale with ticks at 0, 2, ..., 10
+        axis_y = y + CHART_BAR_HEIGHT
+        pdf.set_font("Arial", '', 8)
+        pdf.set_draw_color(*AXIS_GREY)
+        for value in range(0, 11, 2):
+            tick_x = x + CHART_WIDTH * value / 10
+            pdf.line(tick_x, axis_y, tick_x, axis_y + 1.5)
+            pdf.text(tick_x - pdf.get_string_width(str(value)) / 2, axis_y + 5, str(value))
+        pdf.set_draw_color(0, 0, 0)
+        pdf.set_y(axis_y + 7)
 
     def generate_report(self, report_data: AnalysisReport) -> bytes:
         """
         Combines all AI analysis results into a professional PDF report.
         """
+        # fpdf pulls in numpy and fontTools; importing it here keeps them out of start-up
+        from fpdf import FPDF
         pdf = FPDF()
         pdf.add_page()
 
@@ -80,8 +100,7 @@ class PDFReportService:
         # Visual Data Representations
         self._add_section_header(pdf, "3. Sentiment & Tone")
         self._write_body(pdf, f"The overall sentiment of the content is {report_data.ai_summary.sentiment_analysis.sentiment} with a primarily {report_data.ai_summary.sentiment_analysis.tone} tone.")
-        chart_buffer = self._generate_sentiment_chart(report_data.ai_summary.sentiment_analysis)
-        pdf.image(chart_buffer, x=pdf.get_x(), w=150)
+        self._draw_sentiment_chart(pdf, report_data.ai_summary.sentiment_analysis)
         pdf.ln(5)
 
         # Actionable Recommendations
@@ -94,4 +113,5 @@ class PDFReportService:
         self._add_section_header(pdf, "5. Competitive Positioning")
         self._write_body(pdf, report_data.ai_summary.competitive_positioning)
         
-        return pdf.output(dest='S').encode('latin-1')
\ No newline at end of file
+        # fpdf2 returns the document as a bytearray
+        return bytes(pdf.output())
\ No newline at end of file
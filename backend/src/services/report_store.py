@@ -0,0 +1,79 @@
+import asyncio
+import base64
+import uuid
+from typing import Optional
+from ..config import settings
+from ..models.data_models import AnalysisReport
+from ..utils.cache import TieredCache
+from ..utils.metrics import span
+from .report_service import PDFReportService
+
+class ReportStore:
+    """
+    Keeps finished reports server-side under a random ID, so clients request
+    exports by ID instead of uploading the whole report again. A report's PDF
+    is rendered on its first download only and then served from the cache.
+    Both live in the same SQLite file, shared by every worker.
+    """
+    def __init__(self, renderer: Optional[PDFReportService] = None):
+        self.renderer = renderer or PDFReportService()
+        self.reports = self._open('reports')
+        self.pdfs = self._open('report_pdfs')
+
+    @staticmethod
+    def _open(namespace: str) -> TieredCache:
+        return TieredCache(
+            path=settings.REPORT_STORE_PATH,
+            namespace=namespace,
+            ttl_seconds=settings.REPORT_STORE_TTL_SECONDS,
+            memory_max_entries=settings.REPORT_STORE_MEMORY_ENTRIES,
+            disk_max_entries=settings.REPORT_STORE_DISK_ENTRIES,
+        )
+
+    async def save(self, report: AnalysisReport) -> str:
+        """Stores a report and returns its new ID."""
+        report_id = uuid.uuid4().hex
+        with span('report_store'):
+            await asyncio.to_thread(self.reports.set, report_id, report.json(exclude={'report_id'}))
+        return report_id
+
+    async def get(self, report_id: str) -> Optional[AnalysisReport]:
+        with span('report_store'):
+            stored = await asyncio.to_thread(self.reports.get, report_id)
+        if stored is None:
+            return None
+        report = AnalysisReport.parse_raw(stored)
+        report.report_id = report_id
+        return report
+
+    async def get_cached_pdf(self, report_id: str) -> Optional[bytes]:
+        """Returns the PDF already rendered for a report, if any."""
+        with span('report_store'):
+            cached = await asyncio.to_thread(self.pdfs.get, report_id)
+        return base64.b64decode(cached) if cached is not None else None
+
+    async def cache_pdf(self, report_id: str, pdf_bytes: bytes):
+        with span('report_store'):
+            # The cache holds text, so the PDF is stored base64-encoded
+            await asyncio.to_thread(self.pdfs.set, report_id, base64.b64encode(pdf_bytes).decode('ascii'))
+
+    async def get_pdf(self, report_id: str) -> Optional[bytes]:
+        """
+        Returns the PDF export of a stored report, rendering and caching it on
+        the first request. None when the report is unknown or has expired.
+        """
+        pdf_bytes = await self.get_cached_pdf(report_id)
+        if pdf_bytes is not None:
+            return pdf_bytes
+
+        report = await self.get(report_id)
+        if report is None:
+            return None
+        with span('pdf_render'):
+            pdf_bytes = await asyncio.to_thread(self.renderer.generate_report, report)
+        await self.cache_pdf(report_id, pdf_bytes)
+        return pdf_bytes
+
+    def close(self):
+        self.reports.close()
+        self.pdfs.close()
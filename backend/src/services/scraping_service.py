@@ -1,54 +1,229 @@
-import requests
+import asyncio
+import hashlib
+import httpx
 import random
+import ssl
 import time
-from ..utils.security import URLValidator
-from ..processors.content_extractor import extract_and_clean_content
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlparse
+from ..config import settings
+from ..utils.security import URLValidator, validate_content_headers
+from ..utils.dns_resolver import PinnedTransport
+from ..utils.response_store import ResponseStore
+from ..utils.rate_limiter import HostScheduler
+from ..utils.metrics import span
+from ..processors.content_extractor import (
+    HTMLContentExtractor, StreamingHTMLDecoder, extraction_fingerprint
+)
+
+# Statuses worth retrying; anything else (404, 403, ...) fails immediately
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+class OriginUnavailableError(ConnectionError):
+    """
+    Every fetch attempt failed on the network or with a retryable status, so the
+    site is down or overloaded rather than the request being wrong; trying again
+    later may succeed. `retry_after` is the delay the server asked for, if any.
+    """
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+@dataclass
+class FetchedPage:
+    """The HTML for a URL plus what the response store already knows about it."""
+    url: str
+    html: str
+    body_hash: str
+    not_modified: bool = False
+    # Extraction output reused from the store when the body is unchanged
+    extracted: Optional[dict] = None
+    # Extractor that already parsed the body while it streamed in; close() finishes it
+    extractor: Optional[HTMLContentExtractor] = None
 
 class WebScraperService:
     def __init__(self):
-        self.session = requests.Session()
         self.validator = URLValidator()
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36',
         ]
-        self.session.headers.update({
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Connection': 'keep-alive',
-        })
+        ssl_context = (ssl.create_default_context(cafile=settings.SCRAPER_CA_BUNDLE)
+                       if settings.SCRAPER_CA_BUNDLE else httpx.create_ssl_context())
+        # A single pooled async client: connections are reused across scrapes and
+        # the pool size caps how many sockets this worker may hold open at once.
+        self.client = httpx.AsyncClient(
+            headers={
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+                'Accept-Language': 'en-US,en;q=0.5',
+                'Connection': 'keep-alive',
+            },
+            timeout=settings.SCRAPER_TIMEOUT,
+            # Connects only to addresses the SSRF check has validated, redirects included
+            transport=PinnedTransport(
+                self.validator.resolve_public_addresses,
+                ssl_context,
+                httpx.Limits(
+                    max_connections=settings.SCRAPER_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.SCRAPER_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+            ),
+            follow_redirects=True,
+        )
+        self.host_scheduler = HostScheduler(
+            rate=settings.SCRAPER_HOST_RATE,
+            burst=settings.SCRAPER_HOST_BURST,
+            concurrency=settings.SCRAPER_HOST_CONCURRENCY,
+        )
+        self.response_store = None
+        if settings.RESPONSE_STORE_ENABLED:
+            self.response_store = ResponseStore(
+                settings.RESPONSE_STORE_PATH, settings.RESPONSE_STORE_MAX_BYTES, extraction_fingerprint()
+            )
+
+    async def aclose(self):
+        """Releases the pooled connections held by the HTTP client and closes the response store."""
+        await self.client.aclose()
+        if self.response_store is not None:
+            self.response_store.close()
 
-    def _validate_url(self, url: str) -> bool:
-        return self.validator.is_allowed(url) and self.validator.prevent_ssrf(url)
+    async def _validate_url(self, url: str) -> bool:
+        return self.validator.is_allowed(url) and await self.validator.prevent_ssrf(url)
 
-    async def scrape_url(self, url: str) -> dict: # Returns a dictionary now
-        if not self._validate_url(url):
+    async def fetch_page(self, url: str) -> FetchedPage:
+        """
+        Fetches the HTML for a URL without blocking the event loop, retrying
+        transient network failures. When the page is already in the response
+        store, a conditional request is sent and a 304 reuses the stored copy.
+        """
+        # The SSRF check resolves the hostname, so this span is mostly DNS time.
+        # The answer is cached, and the connection reuses the same addresses.
+        with span('dns'):
+            allowed = await self._validate_url(url)
+        if not allowed:
             raise ValueError("URL is invalid, blacklisted, or points to a restricted address.")
 
-        headers = self.session.headers.copy()
-        headers['User-Agent'] = random.choice(self.user_agents)
+        stored = None
+        if self.response_store is not None:
+            with span('response_store'):
+                stored = await asyncio.to_thread(self.response_store.get, url)
 
-        max_retries = 3
+        headers = {'User-Agent': random.choice(self.user_agents)}
+        if stored:
+            headers.update(self.response_store.conditional_headers(stored))
+
+        host = urlparse(url).hostname
+        max_retries = settings.SCRAPER_MAX_RETRIES
         for attempt in range(max_retries):
+            retry_after = None
             try:
-                time.sleep(1)
-                with self.session.get(url, headers=headers, timeout=15, stream=True) as response:
-                    response.raise_for_status()
+                async with self.host_scheduler.slot(host):
+                    with span('fetch'):
+                        async with self.client.stream('GET', url, headers=headers) as response:
+                            if response.status_code == 304 and stored:
+                                return FetchedPage(url, stored['html'], stored['body_hash'], not_modified=True, extracted=stored['extracted'])
 
-                    content_type = response.headers.get('Content-Type', '')
-                    if 'text/html' not in content_type:
-                        raise ValueError(f"URL does not point to an HTML document. Content-Type: {content_type}")
+                            if response.status_code in RETRYABLE_STATUS_CODES:
+                                retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+                            response.raise_for_status()
+                            validate_content_headers(response.headers, max_size=settings.SCRAPER_MAX_CONTENT_BYTES)
+                            stream_parse = settings.EXTRACTION_STREAM_PARSE and not settings.EXTRACTION_PROCESSES
+                            extractor = HTMLContentExtractor() if stream_parse else None
+                            html_content, body_hash = await self._read_body(response, extractor)
 
-                    content = response.content
-                    html_content = content.decode('utf-8', errors='ignore')
-                    
-                    # Directly return the full dictionary from the processor
-                    return extract_and_clean_content(html_content)
+                # An unchanged body still lets us skip re-extraction
+                extracted = stored['extracted'] if stored and stored['body_hash'] == body_hash else None
+                if self.response_store is not None:
+                    with span('response_store'):
+                        await asyncio.to_thread(
+                            self.response_store.put, url,
+                            response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                            body_hash, html_content, extracted
+                        )
+                return FetchedPage(url, html_content, body_hash, extracted=extracted, extractor=extractor)
 
-            except requests.exceptions.RequestException as e:
+            except httpx.HTTPStatusError as e:
+                status_code = e.response.status_code
+                if status_code not in RETRYABLE_STATUS_CODES:
+                    raise ConnectionError(f"Failed to fetch URL: the server responded with HTTP {status_code}.")
+                print(f"Attempt {attempt + 1} failed for {url}: {e}")
+            except httpx.HTTPError as e:
                 print(f"Attempt {attempt + 1} failed for {url}: {e}")
-                if attempt + 1 == max_retries:
-                    raise ConnectionError(f"Failed to fetch URL after {max_retries} attempts.")
-                time.sleep(2)
 
-        raise ConnectionError("Failed to fetch URL after all retries.")
\ No newline at end of file
+            if attempt + 1 == max_retries:
+                raise OriginUnavailableError(f"Failed to fetch URL after {max_retries} attempts.", retry_after)
+            if retry_after is not None and retry_after > settings.SCRAPER_RETRY_AFTER_MAX:
+                raise OriginUnavailableError(f"Server asked to retry after {retry_after:.0f}s; giving up.", retry_after)
+            # Exponential backoff with full jitter, unless the server told us how long to wait
+            backoff = min(settings.SCRAPER_BACKOFF_MAX, settings.SCRAPER_BACKOFF_BASE * 2 ** attempt)
+            with span('retry_backoff'):
+                await asyncio.sleep(retry_after if retry_after is not None else random.uniform(0, backoff))
+
+        raise OriginUnavailableError("Failed to fetch URL after all retries.")
+
+    async def _read_body(self, response: httpx.Response, extractor: Optional[HTMLContentExtractor] = None) -> tuple:
+        """
+        Streams the response body, decoding it chunk by chunk in the detected
+        charset and aborting as soon as the byte cap is exceeded, so memory use
+        stays bounded even when Content-Length is missing or wrong. When an
+        extractor is given, the text is parsed while the rest of the body is
+        still downloading, in a worker thread so the event loop never waits on
+        the parser. One parse runs at a time per page; text that arrives
+        meanwhile is handed to the next one.
+        Returns the decoded HTML and the SHA-256 of the raw body.
+        """
+        decoder = StreamingHTMLDecoder(response.headers.get('Content-Type', ''))
+        digest = hashlib.sha256()
+        text_parts = []
+        unparsed = []
+        parsing = None
+        received = 0
+        try:
+            async for chunk in response.aiter_bytes():
+                received += len(chunk)
+                if received > settings.SCRAPER_MAX_CONTENT_BYTES:
+                    raise ValueError(f"Content exceeds the max size of {settings.SCRAPER_MAX_CONTENT_BYTES} bytes.")
+                digest.update(chunk)
+                text = decoder.feed(chunk)
+                text_parts.append(text)
+                if extractor is not None:
+                    unparsed.append(text)
+                    if parsing is None or parsing.done():
+                        if parsing is not None:
+                            parsing.result()  # surfaces a parser error
+                        parsing = asyncio.ensure_future(asyncio.to_thread(extractor.feed, "".join(unparsed)))
+                        unparsed = []
+            text = decoder.close()
+            text_parts.append(text)
+            if extractor is not None:
+                unparsed.append(text)
+                if parsing is not None:
+                    await parsing
+                    parsing = None
+                await asyncio.to_thread(extractor.feed, "".join(unparsed))
+        finally:
+            if parsing is not None:
+                # The body failed mid-way: the extractor is dropped, and a running parse ends on its own
+                parsing.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return "".join(text_parts), digest.hexdigest()
+
+    async def remember_extraction(self, page: FetchedPage, extracted: dict):
+        """Stores extraction output next to the page so an unchanged page is not parsed again."""
+        if self.response_store is not None:
+            with span('response_store'):
+                await asyncio.to_thread(self.response_store.put_extracted, page.url, page.body_hash, extracted)
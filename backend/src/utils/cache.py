@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+class TieredCache:
+    """
+    A two-tier string cache: a small in-process LRU in front of a SQLite file.
+    The SQLite tier is shared by every uvicorn worker pointing at the same path,
+    and both tiers honor the same TTL. Values are opaque strings (usually JSON).
+    """
+    def __init__(self, path: str, namespace: str, ttl_seconds: int, memory_max_entries: int, disk_max_entries: int):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_entries = disk_max_entries
+        self._memory = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+            # WAL lets several worker processes read while one writes
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries (namespace, accessed_at)")
+
+    def _is_fresh(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds <= 0 or now - stored_at < self.ttl_seconds
+
+    def _remember(self, key: str, stored_at: float, value: str):
+        """Stores an entry in the memory tier, evicting the least recently used one."""
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns the cached value for `key`, or None on a miss or expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and self._is_fresh(entry[0], now):
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return entry[1]
+            self._memory.pop(key, None)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, stored_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                ).fetchone()
+                if row and self._is_fresh(row[1], now):
+                    self._db.execute(
+                        "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                        (now, self.namespace, key)
+                    )
+                    self._remember(key, row[1], row[0])
+                    self.stats['disk_hits'] += 1
+                    return row[0]
+
+            self.stats['misses'] += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """
+        Stores a value in both tiers and trims the disk tier to its size limit.
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self.stats['writes'] += 1
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, value, now, now)
+            )
+            # Drop expired rows and anything beyond the newest `disk_max_entries`
+            cursor = self._db.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND ("
+                "(? > 0 AND stored_at < ?) OR key IN ("
+                "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?))",
+                (self.namespace, self.ttl_seconds, now - self.ttl_seconds, self.namespace, self.disk_max_entries)
+            )
+            self.stats['evictions'] += max(cursor.rowcount, 0)
+
+    def close(self):
+        """Closes the SQLite file. The cache keeps working from memory only afterwards."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def get_stats(self) -> dict:
+        """Returns a snapshot of the hit/miss counters and current tier sizes."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+            if self._db is not None:
+                stats['disk_entries'] = self._db.execute(
+                    "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+                ).fetchone()[0]
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        return stats
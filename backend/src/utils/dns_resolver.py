@@ -0,0 +1,188 @@
+import asyncio
+import contextlib
+import ipaddress
+import socket
+import ssl
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, List
+import httpcore
+import httpx
+
+class DNSResolver:
+    """
+    Resolves hostnames to every A/AAAA address without blocking the event
+    loop. Answers are cached for `ttl_seconds` and failed lookups for
+    `negative_ttl_seconds`; concurrent lookups of the same name share one
+    query. The system resolver does not report record TTLs, so the cache
+    lifetime is fixed and should be kept short.
+    """
+    def __init__(self, ttl_seconds: float, negative_ttl_seconds: float, max_entries: int, timeout: float):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._cache = OrderedDict()  # hostname -> (expires_at, addresses, or the error message)
+        self._pending = {}  # hostname -> lookup task in flight
+
+    async def resolve(self, hostname: str) -> List[str]:
+        """
+        Returns the addresses of `hostname` in resolver order. An IP literal is
+        returned as is. Raises socket.gaierror when the name does not resolve.
+        """
+        hostname = hostname.lower().rstrip('.')
+        try:
+            return [str(ipaddress.ip_address(hostname))]
+        except ValueError:
+            pass
+
+        cached = self._cache.get(hostname)
+        if cached is not None and cached[0] > time.monotonic():
+            self._cache.move_to_end(hostname)
+            return self._answer(cached[1])
+
+        task = self._pending.get(hostname)
+        if task is None:
+            task = self._pending[hostname] = asyncio.ensure_future(self._lookup(hostname))
+            task.add_done_callback(lambda _: self._pending.pop(hostname, None))
+        # Shielded, so a caller that gives up does not cancel the query for the others
+        return self._answer(await asyncio.shield(task))
+
+    @staticmethod
+    def _answer(result) -> List[str]:
+        if isinstance(result, str):
+            raise socket.gaierror(result)
+        return list(result)
+
+    async def _lookup(self, hostname: str):
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await asyncio.wait_for(loop.getaddrinfo(hostname, None, type=socket.SOCK_STREAM), self.timeout)
+            # One entry per address, in the order the resolver prefers them
+            result = tuple(dict.fromkeys(info[4][0] for info in infos))
+            ttl = self.ttl_seconds
+        except (socket.gaierror, asyncio.TimeoutError) as e:
+            result = f"Could not resolve {hostname}: {str(e) or 'timed out'}"
+            ttl = self.negative_ttl_seconds
+
+        self._cache[hostname] = (time.monotonic() + ttl, result)
+        self._cache.move_to_end(hostname)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return result
+
+class PinnedNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    Opens every connection to an address returned by `resolve_addresses`, the
+    same call that vets them, so the HTTP client never resolves a hostname on
+    its own and a DNS answer that changes after validation (DNS rebinding)
+    cannot redirect the request. TLS still verifies the certificate against
+    the hostname. Redirect targets go through the same check.
+    """
+    def __init__(self, resolve_addresses: Callable[[str], Awaitable[List[str]]]):
+        self.resolve_addresses = resolve_addresses
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            addresses = await self.resolve_addresses(host)
+        except socket.gaierror as e:
+            raise httpcore.ConnectError(str(e))
+
+        error = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        raise error or httpcore.ConnectError(f"No address to connect to for {host}.")
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise httpcore.ConnectError("Unix sockets are not allowed.")
+
+    async def sleep(self, seconds: float):
+        await self._backend.sleep(seconds)
+
+# httpcore errors and the httpx errors callers expect, most specific first
+_HTTPCORE_ERRORS = (
+    (httpcore.ConnectTimeout, httpx.ConnectTimeout),
+    (httpcore.ReadTimeout, httpx.ReadTimeout),
+    (httpcore.WriteTimeout, httpx.WriteTimeout),
+    (httpcore.PoolTimeout, httpx.PoolTimeout),
+    (httpcore.TimeoutException, httpx.TimeoutException),
+    (httpcore.ConnectError, httpx.ConnectError),
+    (httpcore.ReadError, httpx.ReadError),
+    (httpcore.WriteError, httpx.WriteError),
+    (httpcore.NetworkError, httpx.NetworkError),
+    (httpcore.LocalProtocolError, httpx.LocalProtocolError),
+    (httpcore.RemoteProtocolError, httpx.RemoteProtocolError),
+    (httpcore.ProtocolError, httpx.ProtocolError),
+    (httpcore.UnsupportedProtocol, httpx.UnsupportedProtocol),
+    (httpcore.ProxyError, httpx.ProxyError),
+)
+
+@contextlib.contextmanager
+def _map_httpcore_errors(request: httpx.Request):
+    try:
+        yield
+    except tuple(httpcore_error for httpcore_error, _ in _HTTPCORE_ERRORS) as e:
+        raise _httpx_error(e, request) from e
+
+def _httpx_error(error: Exception, request: httpx.Request) -> httpx.HTTPError:
+    for httpcore_error, httpx_error in _HTTPCORE_ERRORS:
+        if isinstance(error, httpcore_error):
+            return httpx_error(str(error), request=request)
+
+class _PinnedResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream, request: httpx.Request):
+        self._stream = stream
+        self._request = request
+
+    async def __aiter__(self):
+        with _map_httpcore_errors(self._request):
+            async for chunk in self._stream:
+                yield chunk
+
+    async def aclose(self):
+        await self._stream.aclose()
+
+class PinnedTransport(httpx.AsyncBaseTransport):
+    """
+    An httpx transport whose connection pool connects through
+    PinnedNetworkBackend. It owns its httpcore pool, so it does not depend on
+    httpx internals, and TLS uses the `ssl_context` given by the caller.
+    """
+    def __init__(self, resolve_addresses: Callable[[str], Awaitable[List[str]]],
+                 ssl_context: ssl.SSLContext, limits: httpx.Limits):
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=ssl_context,
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            network_backend=PinnedNetworkBackend(resolve_addresses),
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _map_httpcore_errors(request):
+            response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_PinnedResponseStream(response.stream, request),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._pool.aclose()
@@ -0,0 +1,157 @@
+import ipaddress
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+def normalize_host(host: str) -> str:
+    """Lowercase ASCII (punycode) form of a hostname, without a trailing dot."""
+    host = host.strip().lower().rstrip('.')
+    if not host.isascii():
+        try:
+            host = host.encode('idna').decode('ascii')
+        except UnicodeError:
+            pass
+    return host
+
+class DomainRuleSet:
+    """
+    A compiled set of URL rules, one per line:
+
+        example.com                 example.com and every subdomain of it
+        *.example.com               the same (the wildcard is implied)
+        example.com/admin(/|$)      paths of example.com matching the regex
+        */.*\\.exe$                  paths matching the regex, on any host
+        # comment
+
+    Host rules live in a hash set, and a host is looked up by trying each of
+    its suffixes (a.b.example.com, b.example.com, example.com, com), so a
+    lookup costs one set probe per label whatever the number of rules. Path
+    regexes are grouped by domain into one alternation each, and only run
+    for domains the host belongs to.
+    """
+    def __init__(self, rules: Iterable[str] = ()):
+        self.domains = set()
+        self._path_patterns: Dict[str, List[str]] = {}
+        self._path_regexes: Dict[str, re.Pattern] = {}
+        self.rule_count = 0
+        for line in rules:
+            self.add(line)
+        self._compile()
+
+    @classmethod
+    def from_file(cls, path: str) -> 'DomainRuleSet':
+        with open(path, encoding='utf-8') as rules_file:
+            return cls(rules_file)
+
+    def add(self, rule: str):
+        rule = rule.strip()
+        if not rule or rule.startswith('#'):
+            return
+        host, slash, path_pattern = rule.partition('/')
+        host = host.removeprefix('*.')
+        host = '*' if host in ('*', '') else normalize_host(host)
+        if slash:
+            try:
+                re.compile('/' + path_pattern)  # fail on the bad line, not on the combined pattern
+            except re.error as e:
+                raise ValueError(f"Invalid path regex in URL rule {rule!r}: {e}")
+            self._path_patterns.setdefault(host, []).append('/' + path_pattern)
+        elif host == '*':
+            return  # a bare "*" would match every URL; use an empty whitelist instead
+        else:
+            self.domains.add(host)
+        self.rule_count += 1
+
+    def _compile(self):
+        self._path_regexes = {
+            host: re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+            for host, patterns in self._path_patterns.items()
+        }
+
+    def __len__(self) -> int:
+        return self.rule_count
+
+    def _suffixes(self, host: str) -> List[str]:
+        # Only IP literals end in a digit or contain a colon; no top-level domain does
+        if host[-1:].isdigit() or ':' in host:
+            try:
+                ipaddress.ip_address(host)
+                return [host]  # an IP only matches itself, not "0.1" or "1"
+            except ValueError:
+                pass
+        labels = host.split('.')
+        return [".".join(labels[index:]) for index in range(len(labels))]
+
+    def match(self, host: str, path: str = '/') -> Optional[str]:
+        """
+        Returns the domain of the first rule matching the URL's host and path
+        ("*" for a rule on any host), or None when no rule matches.
+        """
+        suffixes = self._suffixes(normalize_host(host))
+        for suffix in suffixes:
+            if suffix in self.domains:
+                return suffix
+        if self._path_regexes:
+            path = path or '/'
+            for suffix in suffixes + ['*']:
+                regex = self._path_regexes.get(suffix)
+                if regex is not None and regex.match(path):
+                    return suffix
+        return None
+
+class RuleFile:
+    """
+    A DomainRuleSet loaded from a file and reloaded when the file changes.
+    The file's modification time is checked at most every `check_interval`
+    seconds; a changed file is parsed in a background thread and swapped in
+    whole, so lookups never wait for a reload and never see half a list.
+    A file that fails to parse leaves the previous rules in place.
+    """
+    def __init__(self, path: str, check_interval: float):
+        self.path = path
+        self.check_interval = check_interval
+        self._version = self._stat()
+        self.rules = DomainRuleSet.from_file(path)
+        self._checked_at = time.monotonic()
+        self._reloading = False
+        self._lock = threading.Lock()
+
+    def current(self) -> DomainRuleSet:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._reload_if_changed()
+        return self.rules
+
+    def _stat(self) -> tuple:
+        # Size as well as mtime, for filesystems with coarse timestamps
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _reload_if_changed(self):
+        try:
+            version = self._stat()
+        except OSError as e:
+            print(f"Could not check URL rule file {self.path}: {e}")
+            return
+        with self._lock:
+            if version == self._version or self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, args=(version,), daemon=True).start()
+
+    def _reload(self, version: tuple):
+        try:
+            started = time.perf_counter()
+            rules = DomainRuleSet.from_file(self.path)
+            self.rules = rules
+            self._version = version
+            print(f"Reloaded {len(rules)} URL rules from {self.path} in {time.perf_counter() - started:.2f}s")
+        except (OSError, ValueError) as e:
+            print(f"Keeping the previous URL rules; failed to reload {self.path}: {e}")
+            self._version = version  # retried once the file changes again
+        finally:
+            with self._lock:
+                self._reloading = False
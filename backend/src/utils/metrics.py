@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets: from a cached lookup to a long Gemini call
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Counter:
+    """A Prometheus counter with labels. Thread-safe, since stages also run in worker threads."""
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value:g}")
+        return lines
+
+class Histogram:
+    """A Prometheus histogram with labels and fixed buckets."""
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        """How many values have been observed for these label values."""
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            return series[len(self.buckets)] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                bounds = [f"{bound:g}" for bound in self.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, series):
+                    labels = _format_labels(self.label_names, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                total = series[len(self.buckets)]
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {series[-1]:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {total}")
+        return lines
+
+STAGE_SECONDS = Histogram('analyzer_stage_duration_seconds', 'Time spent in each pipeline stage.', ('stage',))
+STAGE_ERRORS = Counter('analyzer_stage_errors_total', 'Pipeline stages that ended with an exception.', ('stage', 'error'))
+REQUEST_SECONDS = Histogram('analyzer_http_request_duration_seconds', 'Time to serve an HTTP request, including the streamed body.', ('method', 'route'))
+REQUESTS = Counter('analyzer_http_requests_total', 'HTTP requests served, by response status.', ('method', 'route', 'status'))
+COALESCED_CALLS = Counter('analyzer_coalesced_calls_total', 'Calls that joined an identical call already in flight instead of running their own.', ('layer',))
+_METRICS = (STAGE_SECONDS, STAGE_ERRORS, REQUEST_SECONDS, REQUESTS, COALESCED_CALLS)
+
+def render_metrics() -> str:
+    """All metrics of this worker in the Prometheus text exposition format."""
+    return "\n".join(line for metric in _METRICS for line in metric.render()) + "\n"
+
+# --- Per-request spans ---
+
+# (stage, seconds, error class name or None) for every span finished during the current request
+Span = Tuple[str, float, Optional[str]]
+_request_spans: ContextVar[Optional[List[Span]]] = ContextVar('request_spans', default=None)
+
+@contextmanager
+def collect_spans() -> Iterator[List[Span]]:
+    """
+    Collects the spans finished in this context, including threads started with
+    asyncio.to_thread and tasks created inside it, into the yielded list.
+    """
+    spans: List[Span] = []
+    token = _request_spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _request_spans.reset(token)
+
+def record_spans(spans: List[Span]):
+    """Records spans measured elsewhere (e.g. in a worker process) as if they ran here."""
+    current = _request_spans.get()
+    for stage, seconds, error in spans:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        if error is not None:
+            STAGE_ERRORS.inc(stage=stage, error=error)
+        if current is not None:
+            current.append((stage, seconds, error))
+
+@contextmanager
+def span(stage: str):
+    """Times the enclosed block as `stage`, counting it as an error if an exception escapes."""
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        record_spans([(stage, time.perf_counter() - started, error)])
+
+@asynccontextmanager
+async def queued(semaphore: asyncio.Semaphore, stage: str):
+    """Acquires `semaphore`, timing the wait for a free slot as `stage`."""
+    with span(stage):
+        await semaphore.acquire()
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+def format_server_timing(spans: List[Span], total_seconds: float) -> str:
+    """
+    Builds a Server-Timing header value. Repeated stages (retries, map-reduce
+    calls) are summed, so stages that overlap can add up to more than the total.
+    """
+    durations = {}
+    for stage, seconds, _ in spans:
+        durations[stage] = durations.get(stage, 0.0) + seconds
+    durations['total'] = total_seconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in durations.items())
@@ -0,0 +1,65 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+class SelfHealingProcessPool:
+    """
+    A ProcessPoolExecutor of 'spawn' workers that replaces itself when one of
+    them dies. A dead worker (out of memory, a crash in a C extension) breaks
+    the whole executor for good, so without this every later call would fail
+    until the API process restarts. `name` appears in the log line, and
+    `on_replace` runs after each replacement, e.g. to warm up the new workers.
+    """
+    def __init__(self, max_workers: int, name: str, initializer: Optional[Callable] = None,
+                 on_replace: Optional[Callable[[], None]] = None):
+        self.max_workers = max_workers
+        self.name = name
+        self.initializer = initializer
+        self.on_replace = on_replace
+        self.executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # 'spawn' keeps workers independent of the threads and sockets of the API process
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=self.initializer,
+        )
+
+    def submit(self, fn: Callable, *args) -> Future:
+        return self.executor.submit(fn, *args)
+
+    async def run(self, fn: Callable, *args):
+        """
+        Runs fn(*args) in a worker. If the pool turns out to be broken, the call is
+        retried once on a new pool, since the worker that died may have been
+        running another caller's work.
+        """
+        try:
+            return await self._run(fn, *args)
+        except BrokenProcessPool:
+            return await self._run(fn, *args)
+
+    async def _run(self, fn: Callable, *args):
+        executor = self.executor
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            self._replace(executor)
+            raise
+
+    def _replace(self, broken: ProcessPoolExecutor):
+        # Every caller on the broken pool gets here; only the first replaces it
+        if self.executor is not broken:
+            return
+        print(f"A worker process of the {self.name} pool died; replacing the pool")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.executor = self._create_executor()
+        if self.on_replace is not None:
+            self.on_replace()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from .metrics import queued, span
+
+class TokenBucket:
+    """
+    An asyncio token bucket: refills at `rate` tokens per second up to `capacity`.
+    Waiters are served in arrival order.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def is_full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+    async def acquire(self):
+        """Waits until a token is available and consumes it."""
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+class _HostState:
+    def __init__(self, rate: float, burst: float, concurrency: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight = 0
+
+class HostScheduler:
+    """
+    Politeness scheduler for outgoing requests. Each host gets its own token
+    bucket (request rate) and semaphore (concurrent connections), so one busy
+    domain is throttled while requests to other hosts proceed untouched.
+    """
+    def __init__(self, rate: float, burst: float, concurrency: int, max_tracked_hosts: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_tracked_hosts = max_tracked_hosts
+        self._hosts = {}
+
+    def _state_for(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            if len(self._hosts) >= self.max_tracked_hosts:
+                self._prune_idle_hosts()
+            state = self._hosts[host] = _HostState(self.rate, self.burst, self.concurrency)
+        return state
+
+    def _prune_idle_hosts(self):
+        """Forgets hosts with nothing in flight and a full bucket; they carry no state worth keeping."""
+        for host in [h for h, s in self._hosts.items() if s.in_flight == 0 and s.bucket.is_full()]:
+            del self._hosts[host]
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        """
+        Holds one of the host's concurrency slots for the duration of the block,
+        after waiting for the host's rate limit to allow another request.
+        """
+        state = self._state_for(host.lower())
+        state.in_flight += 1
+        try:
+            async with queued(state.semaphore, 'host_wait'):
+                with span('host_rate_limit'):
+                    await state.bucket.acquire()
+                yield
+        finally:
+            state.in_flight -= 1
@@ -0,0 +1,112 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+class ResponseStore:
+    """
+    An on-disk store of previously fetched pages, used to make conditional
+    HTTP requests. For each URL it keeps the validators (ETag, Last-Modified),
+    a hash of the body, the HTML itself and, once computed, the extracted
+    content so an unchanged page needs neither a download nor a re-parse.
+    Extracted content is only reused if it was produced by the same
+    `extraction_version`; older results are ignored and replaced.
+    The store is trimmed to `max_bytes` (page and extracted content together)
+    by evicting least recently used pages.
+    """
+    def __init__(self, path: str, max_bytes: int, extraction_version: str = ''):
+        self.max_bytes = max_bytes
+        self.extraction_version = extraction_version
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body_hash TEXT NOT NULL, "
+            "html TEXT NOT NULL, extracted TEXT, size INTEGER NOT NULL, "
+            "stored_at REAL NOT NULL, accessed_at REAL NOT NULL, extraction_version TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(responses)")}
+        if 'extraction_version' not in columns:  # stores created before extraction versions
+            self._db.execute("ALTER TABLE responses ADD COLUMN extraction_version TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Returns the stored entry for a URL as a dict, or None if it is not stored.
+        'extracted' is None unless it came from the current extraction version.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, body_hash, html, extracted, extraction_version FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        return {
+            'etag': row[0],
+            'last_modified': row[1],
+            'body_hash': row[2],
+            'html': row[3],
+            'extracted': json.loads(row[4]) if row[4] and row[5] == self.extraction_version else None,
+        }
+
+    def conditional_headers(self, entry: Optional[dict]) -> dict:
+        """Builds If-None-Match / If-Modified-Since headers from a stored entry."""
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], body_hash: str, html: str, extracted: Optional[dict] = None):
+        """
+        Stores (or replaces) the response for a URL, then enforces the size limit.
+        """
+        now = time.time()
+        extracted_json = json.dumps(extracted) if extracted is not None else None
+        size = len(html.encode('utf-8')) + len((extracted_json or '').encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, body_hash, html, extracted, size, "
+                "stored_at, accessed_at, extraction_version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, body_hash, html, extracted_json, size, now, now,
+                 self.extraction_version if extracted is not None else None)
+            )
+            self._evict()
+
+    def put_extracted(self, url: str, body_hash: str, extracted: dict):
+        """Attaches extracted content to a stored page, if that exact body is still stored."""
+        extracted_json = json.dumps(extracted)
+        extracted_size = len(extracted_json.encode('utf-8'))
+        with self._lock:
+            # The size now counts the page plus the new extracted content, replacing any older one
+            self._db.execute(
+                "UPDATE responses SET extracted = ?, extraction_version = ?, "
+                "size = LENGTH(CAST(html AS BLOB)) + ? WHERE url = ? AND body_hash = ?",
+                (extracted_json, self.extraction_version, extracted_size, url, body_hash)
+            )
+            self._evict()
+
+    def _evict(self):
+        """Deletes least recently used pages until the store fits in `max_bytes`."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._db.execute("SELECT url, size FROM responses ORDER BY accessed_at ASC").fetchall():
+            self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        with self._lock:
+            self._db.close()
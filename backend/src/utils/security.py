@@ -1,14 +1,31 @@
+import ipaddress
 import socket
-import re
+from typing import List, Optional
 from urllib.parse import urlparse
 import bleach
+from ..config import settings
+from .dns_resolver import DNSResolver
+from .domain_rules import DomainRuleSet, RuleFile
 
 # --- Configuration for Whitelist/Blacklist ---
-# These lists can be expanded or moved to a separate settings file.
+# Rules in the DomainRuleSet format: a domain (covering its subdomains) or a
+# domain followed by a path regex. Longer lists go in the files named by
+# URL_WHITELIST_FILE / URL_BLACKLIST_FILE, which are added to these.
 # By default, the whitelist is empty (allowing all URLs that are not blacklisted).
-URL_WHITELIST_PATTERNS = []
+URL_WHITELIST_RULES = []
 # Example: Disallow scraping from any '.gov' or '.mil' domain
-URL_BLACKLIST_PATTERNS = [r"^https?://[a-zA-Z0-9-.]+\.gov(/.*)?$", r"^https?://[a-zA-Z0-9-.]+\.mil(/.*)?$"]
+URL_BLACKLIST_RULES = ['gov', 'mil']
+# Addresses a scrape may never connect to: private, loopback, link-local, CGNAT,
+# multicast, reserved and documentation ranges, for both IPv4 and IPv6.
+BLOCKED_NETWORKS = [ipaddress.ip_network(network) for network in (
+    '0.0.0.0/8', '10.0.0.0/8', '100.64.0.0/10', '127.0.0.0/8', '169.254.0.0/16', '172.16.0.0/12',
+    '192.0.0.0/24', '192.0.2.0/24', '192.88.99.0/24', '192.168.0.0/16', '198.18.0.0/15',
+    '198.51.100.0/24', '203.0.113.0/24', '224.0.0.0/4', '240.0.0.0/4',
+    '::/96', '64:ff9b:1::/48', '100::/64', '2001::/23', '2001:db8::/32',
+    'fc00::/7', 'fe80::/10', 'fec0::/10', 'ff00::/8',
+)]
+# The well-known NAT64 prefix (RFC 6052): the last 32 bits are the IPv4 address being reached
+NAT64_WELL_KNOWN_PREFIX = ipaddress.ip_network('64:ff9b::/96')
 
 
 # --- Component 1 & 2: URL Validation and Private IP Blocking ---
@@ -17,62 +34,91 @@ class URLValidator:
     """
     Handles comprehensive URL validation including whitelists, blacklists, and SSRF prevention.
     """
-    def __init__(self, whitelist=URL_WHITELIST_PATTERNS, blacklist=URL_BLACKLIST_PATTERNS):
-        self.whitelist = [re.compile(p) for p in whitelist]
-        self.blacklist = [re.compile(p) for p in blacklist]
+    def __init__(self, whitelist=URL_WHITELIST_RULES, blacklist=URL_BLACKLIST_RULES,
+                 blocked_networks=BLOCKED_NETWORKS, resolver: Optional[DNSResolver] = None,
+                 whitelist_file: str = settings.URL_WHITELIST_FILE, blacklist_file: str = settings.URL_BLACKLIST_FILE):
+        self.whitelist = DomainRuleSet(whitelist)
+        self.blacklist = DomainRuleSet(blacklist)
+        reload_seconds = settings.URL_RULES_RELOAD_SECONDS
+        self.whitelist_file = RuleFile(whitelist_file, reload_seconds) if whitelist_file else None
+        self.blacklist_file = RuleFile(blacklist_file, reload_seconds) if blacklist_file else None
+        self.blocked_networks = list(blocked_networks)
+        self.resolver = resolver or DNSResolver(
+            ttl_seconds=settings.DNS_CACHE_TTL_SECONDS,
+            negative_ttl_seconds=settings.DNS_NEGATIVE_TTL_SECONDS,
+            max_entries=settings.DNS_CACHE_MAX_ENTRIES,
+            timeout=settings.DNS_TIMEOUT_SECONDS,
+        )
 
     def is_allowed(self, url: str) -> bool:
         """
         Checks a URL against the configured whitelist and blacklist.
         """
-        # If a whitelist is defined, the URL must match one of its patterns.
-        if self.whitelist and not any(pattern.match(url) for pattern in self.whitelist):
+        parsed = urlparse(url)
+        host, path = parsed.hostname or '', parsed.path or '/'
+        whitelists = [rules for rules in (self.whitelist, self.whitelist_file and self.whitelist_file.current()) if rules]
+        blacklists = [rules for rules in (self.blacklist, self.blacklist_file and self.blacklist_file.current()) if rules]
+
+        # If a whitelist is defined, the URL must match one of its rules.
+        if whitelists and not any(rules.match(host, path) for rules in whitelists):
             print(f"URL blocked: Not in whitelist - {url}")
             return False
-        
-        # The URL must not match any pattern in the blacklist.
-        if self.blacklist and any(pattern.match(url) for pattern in self.blacklist):
-            print(f"URL blocked: In blacklist - {url}")
-            return False
-        
+
+        # The URL must not match any rule in the blacklist.
+        for rules in blacklists:
+            matched = rules.match(host, path)
+            if matched is not None:
+                print(f"URL blocked: In blacklist ({matched}) - {url}")
+                return False
+
         return True
 
-    def _is_private_ip(self, ip: str) -> bool:
-        """Checks if the given IP address is in a private range."""
+    def is_blocked_address(self, address: str) -> bool:
+        """Checks if an IP address lies in one of the blocked networks."""
         try:
-            is_private = socket.inet_aton(ip)
-            return (
-                is_private[0] == 10 or
-                (is_private[0] == 172 and 16 <= is_private[1] <= 31) or
-                (is_private[0] == 192 and is_private[1] == 168) or
-                is_private[0] == 127
-            )
-        except socket.error:
-            return False
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return True
+        # IPv6 forms that embed an IPv4 address are judged by that address
+        if ip.version == 6:
+            embedded = ip.ipv4_mapped or ip.sixtofour
+            if embedded is None and ip in NAT64_WELL_KNOWN_PREFIX:
+                embedded = ipaddress.IPv4Address(int(ip) & 0xFFFFFFFF)
+            if embedded is not None:
+                ip = embedded
+        return any(ip in network for network in self.blocked_networks)
 
-    def prevent_ssrf(self, url: str) -> bool:
+    async def resolve_public_addresses(self, hostname: str) -> List[str]:
         """
-        Validates a URL to prevent SSRF by checking for private IP ranges.
-        Returns True if the URL is safe, False otherwise.
+        Resolves a hostname and returns all of its addresses, which are then
+        safe to connect to. Raises ValueError when any A/AAAA record points to
+        a blocked network (one bad record is enough to rebind to it), and
+        socket.gaierror when the name does not resolve.
+        """
+        addresses = await self.resolver.resolve(hostname)
+        for address in addresses:
+            if self.is_blocked_address(address):
+                print(f"URL blocked: {hostname} points to a restricted IP - {address}")
+                raise ValueError("URL points to a restricted address.")
+        return addresses
+
+    async def prevent_ssrf(self, url: str) -> bool:
+        """
+        Validates a URL to prevent SSRF by checking every address its host
+        resolves to. Returns True if the URL is safe, False otherwise.
         """
         try:
             hostname = urlparse(url).hostname
             if not hostname:
                 return False
-            
-            ip_address = socket.gethostbyname(hostname)
-
-            if self._is_private_ip(ip_address):
-                print(f"URL blocked: Points to a private IP - {ip_address}")
-                return False
-
+            await self.resolve_public_addresses(hostname)
             return True
         except (socket.gaierror, ValueError):
             return False
 
 # --- Component 3 & 4: Content Length and File Type Validation ---
 
-def validate_content_headers(headers: dict) -> bool:
+def validate_content_headers(headers: dict, max_size: int = 5 * 1024 * 1024) -> bool:
     """
     Validates response headers for content type and length.
     """
@@ -83,7 +129,6 @@ def validate_content_headers(headers: dict) -> bool:
 
     # Content Length Restriction
     content_length = int(headers.get('Content-Length', 0))
-    max_size = 5 * 1024 * 1024  # 5 MB
     if content_length > 0 and content_length > max_size:
         raise ValueError(f"Content length {content_length} exceeds the max size of {max_size} bytes.")
     
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+from .metrics import COALESCED_CALLS
+
+T = TypeVar('T')
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller starts the
+    call, and everyone who asks for the same key before it finishes awaits
+    that one task and shares its result or exception. The call is cancelled
+    only when every caller waiting on it has been cancelled. `layer` labels
+    the coalesced-call counter on /metrics.
+    """
+    def __init__(self, layer: str):
+        self.layer = layer
+        self._calls: Dict[str, _Call] = {}
+
+    async def run(self, key: str, start_call: Callable[[], Awaitable[T]]) -> T:
+        call = self.join(key, start_call)
+        try:
+            # Shielded, so one caller going away does not cancel the call for the rest
+            return await asyncio.shield(call.task)
+        finally:
+            self.leave(key, call)
+
+    def join(self, key: str, start_call: Callable[[], Awaitable[T]]) -> _Call:
+        """
+        Starts the call for `key`, or joins the one already running, without
+        waiting for it. The caller counts as waiting until it calls leave().
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(start_call()))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            COALESCED_CALLS.inc(layer=self.layer)
+        call.waiters += 1
+        return call
+
+    def leave(self, key: str, call: _Call):
+        call.waiters -= 1
+        if call.waiters == 0 and not call.task.done():
+            call.task.cancel()
+            # A caller arriving while the cancellation lands starts afresh
+            self._forget(key, call)
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -4,25 +4,88 @@ import json
 import pandas as pd
 import matplotlib.pyplot as plt
 import io
+import os
+import tempfile
 
 # --- Configuration & State Management ---
 st.set_page_config(page_title="Web Content Analyzer", layout="wide")
 
+# History keeps compact summaries only; full reports are loaded from the backend when opened
+HISTORY_PAGE_SIZE = 10
+# Full reports and PDFs kept in the session, most recently used last
+SESSION_CACHE_SIZE = 10
+# Must not exceed the backend's BULK_EXPORT_MAX_REPORTS
+BULK_EXPORT_MAX_REPORTS = 1000
+
 if 'history' not in st.session_state:
     st.session_state.history = []
+if 'pdf_cache' not in st.session_state:
+    st.session_state.pdf_cache = {}  # report_id -> PDF bytes, filled only on request
+if 'report_cache' not in st.session_state:
+    st.session_state.report_cache = {}  # report_id -> full report, for opened history entries
 
 # --- THE FIX IS HERE ---
 # Use the 'backend' hostname when running inside Docker
-# BACKEND_URL_ANALYZE = "http://backend:8000/analyze"
-# BACKEND_URL_EXPORT = "http://backend:8000/export/pdf"
+# BACKEND_URL_ANALYZE_STREAM = "http://backend:8000/analyze/stream"
+# BACKEND_URL_ANALYZE_BATCH = "http://backend:8000/analyze/batch"
+# BACKEND_URL_REPORTS = "http://backend:8000/reports"
+# BACKEND_URL_BULK_EXPORT = "http://backend:8000/export/bulk"
 
 # Use the '127.0.0.1' address for local development (when not using Docker)
-BACKEND_URL_ANALYZE = "http://127.0.0.1:8000/analyze"
-BACKEND_URL_EXPORT = "http://127.0.0.1:8000/export/pdf"
+BACKEND_URL_ANALYZE_STREAM = "http://127.0.0.1:8000/analyze/stream"
+BACKEND_URL_ANALYZE_BATCH = "http://127.0.0.1:8000/analyze/batch"
+BACKEND_URL_REPORTS = "http://127.0.0.1:8000/reports"
+BACKEND_URL_BULK_EXPORT = "http://127.0.0.1:8000/export/bulk"
 # --- END OF FIX ---
 
 
 # --- Helper Functions ---
+def remember(cache: dict, key, value):
+    """Stores a value in a session cache, dropping the least recently used entries beyond SESSION_CACHE_SIZE."""
+    cache.pop(key, None)
+    cache[key] = value
+    while len(cache) > SESSION_CACHE_SIZE:
+        cache.pop(next(iter(cache)))
+
+def error_detail(response) -> str:
+    """
+    The backend's error message for a failed request. FastAPI validation errors
+    are a list of {loc, msg} entries, shown as "field: message" pairs.
+    """
+    try:
+        detail = response.json().get('detail')
+    except ValueError:
+        return response.text or f"HTTP {response.status_code}"
+    if isinstance(detail, list):
+        messages = []
+        for error in detail:
+            # The first loc item only says where the field was sent ("body", "query")
+            field = ".".join(str(part) for part in error.get('loc', [])[1:])
+            messages.append(f"{field}: {error.get('msg')}" if field else str(error.get('msg')))
+        return "; ".join(messages)
+    return str(detail or f"HTTP {response.status_code}")
+
+def summarize_report(report_data: dict) -> dict:
+    """The compact history entry for a report: enough to list it and to load it again."""
+    return {
+        "report_id": report_data['report_id'],
+        "url": report_data['url'],
+        "title": report_data.get('content_analysis', {}).get('title') or 'N/A',
+        "sentiment": report_data.get('ai_summary', {}).get('sentiment_analysis', {}).get('sentiment', 'N/A'),
+    }
+
+def load_full_report(report_id: str):
+    """Returns the full report from the session cache or the backend, or None if it has expired."""
+    cache = st.session_state.report_cache
+    if report_id not in cache:
+        response = requests.get(f"{BACKEND_URL_REPORTS}/{report_id}", timeout=30)
+        if response.status_code != 200:
+            return None
+        remember(cache, report_id, response.json())
+    else:
+        remember(cache, report_id, cache[report_id])
+    return cache[report_id]
+
 def convert_to_csv(data: dict) -> str:
     """Flattens the JSON report and converts it to a CSV string."""
     df = pd.json_normalize(data)
@@ -43,9 +106,72 @@ def create_sentiment_chart(sentiment_data: dict):
     ax.set_xticks([])
     plt.box(False)
     st.pyplot(fig)
+    plt.close(fig)  # Streamlit has the image now; open figures would pile up across reruns
 
-def display_report(report_data):
-    """Renders a single, enhanced analysis report."""
+def pdf_export(report_data, file_prefix, key):
+    """
+    Offers the PDF of a saved report. The backend renders it only when the user
+    asks for it, and the bytes are kept in the session for later reruns.
+    """
+    report_id = report_data.get('report_id')
+    if not report_id:
+        st.caption("PDF export is not available for this report.")
+        return
+    if report_id not in st.session_state.pdf_cache:
+        if not st.button("Prepare PDF", key=f"prepare_pdf_{key}"):
+            return
+        with st.spinner("Generating PDF..."):
+            pdf_response = requests.get(f"{BACKEND_URL_REPORTS}/{report_id}/pdf", timeout=60)
+        if pdf_response.status_code != 200:
+            st.error(f"PDF export failed: {error_detail(pdf_response)}")
+            return
+        remember(st.session_state.pdf_cache, report_id, pdf_response.content)
+    st.download_button("Download as PDF", st.session_state.pdf_cache[report_id], f"report_{file_prefix}.pdf", "application/pdf", key=f"download_pdf_{key}")
+
+def bulk_export(report_ids):
+    """
+    Offers the newest reports in one ZIP (a PDF per report plus a combined CSV),
+    built by the backend only when asked for. The ZIP is streamed into a temporary
+    file and only its path is kept in the session.
+    """
+    # The backend refuses larger exports, so only the newest ones are sent
+    report_ids = report_ids[-BULK_EXPORT_MAX_REPORTS:]
+    prepared = st.session_state.get('bulk_zip')
+    # A ZIP prepared before more reports were added is stale
+    if prepared and prepared[0] == report_ids and os.path.exists(prepared[1]):
+        offer_bulk_zip(prepared[1])
+        return
+    label = f"Prepare ZIP of the newest {len(report_ids)} reports" if len(report_ids) < len(st.session_state.history) else f"Prepare ZIP of all {len(report_ids)} reports"
+    if not st.button(label, key="prepare_bulk_zip"):
+        return
+    zip_file = tempfile.NamedTemporaryFile(prefix="analysis_reports_", suffix=".zip", delete=False)
+    try:
+        with zip_file, st.spinner("Rendering reports..."):
+            with requests.post(BACKEND_URL_BULK_EXPORT, json={"report_ids": report_ids}, stream=True, timeout=600) as response:
+                if response.status_code != 200:
+                    st.error(f"Bulk export failed: {error_detail(response)}")
+                    os.remove(zip_file.name)
+                    return
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    zip_file.write(chunk)
+    except requests.RequestException as e:
+        os.remove(zip_file.name)
+        st.error(f"Bulk export failed: {e}")
+        return
+    if prepared and os.path.exists(prepared[1]):
+        os.remove(prepared[1])
+    st.session_state.bulk_zip = (report_ids, zip_file.name)
+    offer_bulk_zip(zip_file.name)
+
+def offer_bulk_zip(path):
+    # Read from disk only when the button is clicked, so reruns don't load the ZIP
+    def read_zip():
+        with open(path, 'rb') as f:
+            return f.read()
+    st.download_button("Download all reports (ZIP)", read_zip, "analysis_reports.zip", "application/zip", key="download_bulk_zip")
+
+def display_report(report_data, key):
+    """Renders a single, enhanced analysis report. `key` keeps its widgets unique on the page."""
     analysis = report_data.get('content_analysis', {})
     ai_summary = report_data.get('ai_summary', {})
     
@@ -87,15 +213,117 @@ def display_report(report_data):
     file_prefix = report_data.get('url').replace('https://', '').replace('http://', '').split('/')[0]
     
     with c1:
-        st.download_button("Download as JSON", json.dumps(report_data, indent=2), f"report_{file_prefix}.json", "application/json")
+        st.download_button("Download as JSON", json.dumps(report_data, indent=2), f"report_{file_prefix}.json", "application/json", key=f"download_json_{key}")
     with c2:
         csv_data = convert_to_csv(report_data)
-        st.download_button("Download as CSV", csv_data, f"report_{file_prefix}.csv", "text/csv")
+        st.download_button("Download as CSV", csv_data, f"report_{file_prefix}.csv", "text/csv", key=f"download_csv_{key}")
     with c3:
-        # For local run, we need the full URL for the backend service
-        pdf_response = requests.post(BACKEND_URL_EXPORT, json=report_data)
-        if pdf_response.status_code == 200:
-            st.download_button("Download as PDF", pdf_response.content, f"report_{file_prefix}.pdf", "application/pdf")
+        pdf_export(report_data, file_prefix, key)
+
+def iter_sse_events(response):
+    """Parses a Server-Sent Events response into (event, data) pairs."""
+    event, data_lines = 'message', []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = 'message', []
+        elif line.startswith('event:'):
+            event = line[len('event:'):].strip()
+        elif line.startswith('data:'):
+            data_lines.append(line[len('data:'):].strip())
+
+def analyze_with_live_updates(url: str):
+    """
+    Runs one analysis through the streaming endpoint, showing the extracted
+    content and the model's output while they arrive. Returns the final report,
+    or None if the analysis failed.
+    """
+    status_slot = st.empty()
+    extracted_slot = st.empty()
+    llm_slot = st.empty()
+    status_slot.info(f"Fetching {url}...")
+
+    content_analysis, ai_summary, llm_text = None, None, ""
+    with requests.post(BACKEND_URL_ANALYZE_STREAM, json={"url": url}, stream=True, timeout=180) as response:
+        if response.status_code != 200:
+            status_slot.error(f"Error analyzing {url}: {error_detail(response)}")
+            return None
+        for event, data in iter_sse_events(response):
+            if event == 'fetched':
+                status_slot.info(f"Fetched {url}. Extracting content...")
+            elif event == 'extracted':
+                content_analysis = data
+                status_slot.info(f"Extracted content from {url}. Waiting for the AI analysis...")
+                with extracted_slot.container():
+                    st.markdown(f"**{data.get('title') or 'Untitled page'}**")
+                    st.caption(f"{data.get('content_type')} · Language: {data.get('detected_language')}")
+                    outline = data.get('document_outline', [])[:10]
+                    if outline:
+                        st.markdown("\n".join(f"{'  ' * (h['level'] - 1)}- {h['text']}" for h in outline))
+            elif event == 'llm_delta':
+                llm_text += data.get('text', '')
+                llm_slot.code(llm_text[-2000:], language='json')
+            elif event == 'analysis':
+                ai_summary = data
+            elif event == 'report':
+                status_slot.empty()
+                extracted_slot.empty()
+                llm_slot.empty()
+                return {"url": url, "content_analysis": content_analysis, "ai_summary": ai_summary, "report_id": data.get('report_id')}
+            elif event == 'error':
+                status_slot.error(f"Error analyzing {url}: {data.get('detail')}")
+                extracted_slot.empty()
+                llm_slot.empty()
+                return None
+    status_slot.error(f"The analysis of {url} ended unexpectedly.")
+    return None
+
+def iter_batch_results(urls):
+    """
+    Submits all URLs to the backend batch endpoint, which analyzes them
+    concurrently, and yields each result as soon as it finishes (in completion
+    order). Raises ValueError if the backend rejects the batch as a whole.
+    """
+    # Connect timeout, then the longest wait allowed between two finished URLs
+    with requests.post(BACKEND_URL_ANALYZE_BATCH, json={"urls": urls}, stream=True, timeout=(10, 300)) as response:
+        if response.status_code != 200:
+            raise ValueError(error_detail(response))
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                yield json.loads(line)
+
+def show_report_entry(entry, label, key, open_by_default=False):
+    """
+    Lists a report by its summary; the full report is loaded and rendered only
+    while its "Show full report" toggle is on.
+    """
+    with st.expander(label, expanded=open_by_default):
+        st.caption(f"URL: {entry['url']}")
+        if not st.toggle("Show full report", value=open_by_default, key=f"show_{key}"):
+            return
+        try:
+            report_data = load_full_report(entry['report_id'])
+        except requests.exceptions.RequestException as e:
+            st.error(f"Failed to connect to backend: {e}")
+            return
+        if report_data:
+            display_report(report_data, key=key)
+        else:
+            st.warning("This report is no longer available on the server. Run the analysis again.")
+
+def show_latest_entry(entry, batch_size):
+    # A single new report opens straight away; a batch is listed and opened one report at a time
+    show_report_entry(entry, f"{entry['title']} ({entry['sentiment']})", key=f"latest_{entry['report_id']}",
+                      open_by_default=batch_size == 1)
+
+def show_new_report(report_data, batch_size):
+    entry = summarize_report(report_data)
+    st.session_state.history.append(entry) # Add to history
+    st.session_state.latest_reports.append(entry)
+    # Already here in full, so opening it needs no request to the backend
+    remember(st.session_state.report_cache, entry['report_id'], report_data)
+    show_latest_entry(entry, batch_size)
 
 # --- Main UI ---
 st.title("🚀 Web Content Analyzer")
@@ -112,31 +340,52 @@ with tab1:
         if not urls:
             st.warning("Please enter at least one URL.")
         else:
-            progress_bar = st.progress(0, "Initializing Batch Analysis...")
-            for i, url in enumerate(urls):
+            st.session_state.latest_reports = []
+            if len(urls) == 1:
+                # A single URL is streamed stage by stage so partial results show up early
+                try:
+                    report_data = analyze_with_live_updates(urls[0])
+                    if report_data:
+                        st.success(f"Successfully analyzed {urls[0]}")
+                        show_new_report(report_data, batch_size=1)
+                except requests.exceptions.RequestException as e:
+                    st.error(f"Failed to connect to backend for {urls[0]}: {e}")
+            else:
+                # A batch is analyzed concurrently by the backend; results arrive as each URL finishes
+                progress_bar = st.progress(0, f"Analyzing {len(urls)} URLs concurrently...")
+                finished = 0
                 try:
-                    progress_text = f"Analyzing ({i+1}/{len(urls)}): {url}"
-                    progress_bar.progress((i / len(urls)), text=progress_text)
-                    
-                    payload = {"url": url}
-                    response = requests.post(BACKEND_URL_ANALYZE, json=payload, timeout=180)
-
-                    if response.status_code == 200:
-                        st.success(f"Successfully analyzed {url}")
-                        report_data = response.json()
-                        st.session_state.history.append(report_data) # Add to history
-                        display_report(report_data)
-                    else:
-                        st.error(f"Error analyzing {url}: {response.json().get('detail')}")
+                    for result in iter_batch_results(urls):
+                        finished += 1
+                        progress_bar.progress(finished / len(urls), text=f"Finished {finished}/{len(urls)}: {result['url']}")
+                        if result['status_code'] == 200:
+                            st.success(f"Successfully analyzed {result['url']}")
+                            show_new_report(result['report'], batch_size=len(urls))
+                        else:
+                            st.error(f"Error analyzing {result['url']}: {result['error']}")
+                    progress_bar.progress(1.0, "Batch analysis complete!")
+                except ValueError as e:
+                    st.error(f"The batch was rejected: {e}")
                 except requests.exceptions.RequestException as e:
-                    st.error(f"Failed to connect to backend for {url}: {e}")
-            progress_bar.progress(1.0, "Batch analysis complete!")
+                    st.error(f"Failed to connect to backend: {e}")
+    else:
+        # Keep the last batch listed across reruns, e.g. after preparing a PDF
+        latest_reports = st.session_state.get('latest_reports', [])
+        for entry in latest_reports:
+            show_latest_entry(entry, len(latest_reports))
 
 with tab2:
     st.header("Analysis History")
     if not st.session_state.history:
         st.info("No analyses in history. Run a new analysis to see results here.")
     else:
-        for i, report_data in enumerate(reversed(st.session_state.history)):
-            with st.expander(f"#{len(st.session_state.history)-i} - {report_data.get('content_analysis', {}).get('title', 'N/A')}"):
-                display_report(report_data)
\ No newline at end of file
+        history = st.session_state.history
+        bulk_export([entry['report_id'] for entry in history])
+        page_count = (len(history) + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1) if page_count > 1 else 1
+
+        # Newest first; only this page is rendered, and only opened reports are loaded
+        start = len(history) - (page - 1) * HISTORY_PAGE_SIZE
+        for number in range(start, max(0, start - HISTORY_PAGE_SIZE), -1):
+            entry = history[number - 1]
+            show_report_entry(entry, f"#{number} - {entry['title']} ({entry['sentiment']})", key=f"history_{entry['report_id']}")
\ No newline at end of file
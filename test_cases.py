@@ -4,6 +4,7 @@ import json
 # --- Configuration ---
 # This should be the address of your running backend server.
 BACKEND_URL = "http://127.0.0.1:8000/analyze"
+BACKEND_BATCH_URL = "http://127.0.0.1:8000/analyze/batch"
 
 # --- Test Case Definitions ---
 TEST_CASES = [
@@ -67,6 +68,60 @@ TEST_CASES = [
     },
 ]
 
+# --- Batch Test Case Definitions ---
+# Each batch must be accepted as a whole (200); every URL then gets its own NDJSON result line.
+BATCH_TEST_CASES = [
+    {
+        "id": "TC-B01",
+        "description": "Batch with one malformed URL among valid ones",
+        "urls": ["https://www.nasa.gov", "this is not a valid url", "https://www.microsoft.com"],
+        "expected_status": 200,
+        "expected_url_statuses": {
+            "https://www.nasa.gov/": 400, # Blacklisted, reported inline
+            "this is not a valid url": 422, # Invalid, reported inline instead of failing the batch
+            "https://www.microsoft.com/": 200,
+        },
+    },
+]
+
+def run_batch_tests():
+    """
+    Executes the batch test cases: the batch must be accepted and each URL must
+    come back with its own expected status.
+    """
+    passed_count = 0
+    failed_count = 0
+
+    for test in BATCH_TEST_CASES:
+        print(f"\n--- Running Test Case: {test['id']} ({test['description']}) ---")
+        print(f"URLs: {test['urls']}")
+
+        try:
+            response = requests.post(BACKEND_BATCH_URL, json={"urls": test["urls"]}, timeout=300)
+            print(f"Expected Status: {test['expected_status']}, Got Status: {response.status_code}")
+            url_statuses = {}
+            if response.status_code == 200:
+                for line in response.iter_lines(decode_unicode=True):
+                    if line:
+                        result = json.loads(line)
+                        url_statuses[result["url"]] = result["status_code"]
+            print(f"Expected URL Statuses: {test['expected_url_statuses']}, Got: {url_statuses}")
+
+            if response.status_code == test['expected_status'] and url_statuses == test['expected_url_statuses']:
+                print(f"Result: System behaved as expected. Test PASSED.")
+                passed_count += 1
+            else:
+                print(f"Result: System did NOT behave as expected. Test FAILED.")
+                print(f"Response Body: {response.text}")
+                failed_count += 1
+
+        except requests.exceptions.RequestException as e:
+            print(f"An error occurred during the request: {e}")
+            print(f"Result: Test FAILED due to exception.")
+            failed_count += 1
+
+    return passed_count, failed_count
+
 def run_tests():
     """
     Executes all defined test cases against the backend API.
@@ -103,8 +158,12 @@ def run_tests():
             print(f"Result: Test FAILED due to exception.")
             failed_count += 1
             
+    batch_passed, batch_failed = run_batch_tests()
+    passed_count += batch_passed
+    failed_count += batch_failed
+
     print("\n--- Test Suite Summary ---")
-    print(f"Total Tests: {len(TEST_CASES)}")
+    print(f"Total Tests: {len(TEST_CASES) + len(BATCH_TEST_CASES)}")
     print(f"✅ Passed: {passed_count}")
     print(f"❌ Failed: {failed_count}")
     print("--------------------------")